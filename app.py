@@ -1,12 +1,16 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify, send_from_directory
+from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify, send_from_directory, Response, stream_with_context
 import os
 from datetime import datetime
 from dotenv import load_dotenv
 from werkzeug.utils import secure_filename
 from vin_utils import VINDecoder
+from vin_cache import LRUCache, VINCache
 from eligibility_rules import TuroEligibilityChecker
-from supabase_client import SupabaseLogger
+from fleet_pipeline import FleetPipeline, read_fleet_csv, format_csv, format_ndjson
+from supabase_client import decode_cursor, get_client_stats, get_supabase_logger, summarize_listing
 import base64
+import time
+import io
 import uuid
 import json
 from auth import (
@@ -27,9 +31,15 @@ app = Flask(__name__)
 app.secret_key = os.getenv('FLASK_SECRET_KEY', 'your-secret-key-here')
 
 # Initialize components
-vin_decoder = VINDecoder()
+vin_decoder = VINDecoder(cache=VINCache())
 eligibility_checker = TuroEligibilityChecker()
-supabase_logger = SupabaseLogger()
+supabase_logger = get_supabase_logger()
+
+# Whole /check results keyed by (VIN, mileage, rule version); repeat submissions skip decode, logging and earnings
+check_result_cache = LRUCache(
+    max_size=int(os.getenv('CHECK_RESULT_CACHE_SIZE', 2048)),
+    ttl=float(os.getenv('CHECK_RESULT_CACHE_TTL', 3600))
+)
 
 # Debug: Check if environment variables are loaded
 print(f"SUPABASE_URL loaded: {bool(os.getenv('SUPABASE_URL'))}")
@@ -78,6 +88,21 @@ GLOBAL_USER_LISTINGS = {}
 # Global in-memory storage for contact requests (survives across sessions)
 GLOBAL_CONTACT_REQUESTS = []
 
+# Rows per page for database-backed listing and request pages; ?per_page= can lower or raise it up to MAX_PAGE_SIZE
+PAGE_SIZE = int(os.getenv('PAGE_SIZE', 50))
+MAX_PAGE_SIZE = 200
+
+def get_page_args():
+    """Keyset cursor and page size from the query string (an invalid cursor means the first page)"""
+    cursor = request.args.get('cursor') or None
+    if not decode_cursor(cursor):
+        cursor = None
+    try:
+        per_page = int(request.args.get('per_page', PAGE_SIZE))
+    except ValueError:
+        per_page = PAGE_SIZE
+    return cursor, min(max(per_page, 1), MAX_PAGE_SIZE)
+
 def get_all_cached_listings():
     """Get all listings from all users in the global cache"""
     all_listings = []
@@ -85,30 +110,79 @@ def get_all_cached_listings():
         all_listings.extend(listings)
     return all_listings
 
-def migrate_cached_listings_to_database():
-    """Migrate all cached listings to database (one-time operation)"""
+# Ids of listings already migrated, so an interrupted migration resumes where it stopped
+MIGRATION_CHECKPOINT_PATH = os.getenv('LISTING_MIGRATION_CHECKPOINT', os.path.join('instance', 'listing_migration_checkpoint.json'))
+MIGRATION_CHUNK_SIZE = int(os.getenv('LISTING_MIGRATION_CHUNK_SIZE', 500))
+
+def load_migration_checkpoint():
+    """Listing ids recorded as migrated by earlier runs"""
+    try:
+        with open(MIGRATION_CHECKPOINT_PATH) as f:
+            return set(json.load(f).get('migrated_ids', []))
+    except (OSError, ValueError):
+        return set()
+
+def save_migration_checkpoint(migrated_ids, failed=None):
+    """Record migrated ids, plus the rows the database rejected (retried on the next run)"""
+    os.makedirs(os.path.dirname(os.path.abspath(MIGRATION_CHECKPOINT_PATH)), exist_ok=True)
+    tmp_path = f"{MIGRATION_CHECKPOINT_PATH}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump({
+            'migrated_ids': sorted(migrated_ids),
+            'failed': failed or {},
+            'updated_at': datetime.now().isoformat()
+        }, f)
+    os.replace(tmp_path, MIGRATION_CHECKPOINT_PATH)
+
+def migrate_cached_listings_to_database(restart=False):
+    """Migrate all cached listings to database with chunked upserts on listing id (safe to re-run)"""
+    stats = {'success': False, 'total': 0, 'migrated': 0, 'skipped': 0, 'failed': 0, 'failed_ids': [],
+             'remaining': 0, 'seconds': 0.0, 'listings_per_second': 0.0}
     if not supabase_logger.is_connected():
         print("❌ Cannot migrate: Supabase not connected")
-        return False
+        return stats
     
+    migrated_ids = set() if restart else load_migration_checkpoint()
+    listings = []
+    for user_listings in GLOBAL_USER_LISTINGS.values():
+        for listing in user_listings:
+            # Give id-less listings a stable id in the cache, so a retry upserts the same row
+            if not listing.get('id'):
+                listing['id'] = str(uuid.uuid4())
+            listings.append(listing)
+    
+    stats['total'] = len(listings)
+    pending = [listing for listing in listings if listing['id'] not in migrated_ids]
+    stats['skipped'] = stats['total'] - len(pending)
+    print(f"🚚 Migrating {len(pending)} cached listings ({stats['skipped']} already migrated)")
+    
+    started = time.time()
+    failed = {}
     try:
-        migrated_count = 0
-        for user_id, listings in GLOBAL_USER_LISTINGS.items():
-            for listing in listings:
-                # Try to create listing in database
-                result = supabase_logger.create_listing(listing.copy())
-                if result:
-                    migrated_count += 1
-                    print(f"✅ Migrated listing: {listing.get('year')} {listing.get('make')} {listing.get('model')}")
-                else:
-                    print(f"❌ Failed to migrate: {listing.get('year')} {listing.get('make')} {listing.get('model')}")
-        
-        print(f"🎉 Migration complete! Migrated {migrated_count} listings to database")
-        return True
-        
+        for start in range(0, len(pending), MIGRATION_CHUNK_SIZE):
+            chunk = pending[start:start + MIGRATION_CHUNK_SIZE]
+            # A rejected row (bad user_id, missing location, ...) is isolated instead of failing the chunk
+            chunk_failed = supabase_logger.upsert_listings_isolating_failures(chunk)
+            for listing_id, error in chunk_failed.items():
+                print(f"⚠️ Listing {listing_id} rejected by database: {error}")
+            failed.update(chunk_failed)
+            migrated_ids.update(listing['id'] for listing in chunk if listing['id'] not in chunk_failed)
+            save_migration_checkpoint(migrated_ids, failed)
+            stats['migrated'] += len(chunk) - len(chunk_failed)
+            stats['failed'] += len(chunk_failed)
+            elapsed = time.time() - started
+            print(f"⏳ Migrated {stats['migrated']}/{len(pending)} listings, {stats['failed']} rejected ({stats['migrated'] / max(elapsed, 1e-9):.0f}/s)")
+        stats['success'] = True
     except Exception as e:
-        print(f"❌ Migration failed: {e}")
-        return False
+        print(f"❌ Migration stopped after {stats['migrated']} listings: {e} (re-run to resume)")
+    
+    stats['failed_ids'] = sorted(failed)
+    stats['remaining'] = len(pending) - stats['migrated'] - stats['failed']
+    stats['seconds'] = round(time.time() - started, 2)
+    stats['listings_per_second'] = round(stats['migrated'] / stats['seconds'], 1) if stats['seconds'] else float(stats['migrated'])
+    if stats['success']:
+        print(f"🎉 Migration complete! Migrated {stats['migrated']} listings in {stats['seconds']}s ({stats['listings_per_second']}/s)")
+    return stats
 
 def save_user_listings_to_cache(user_id, listings):
     """Save user listings to global memory cache"""
@@ -170,26 +244,55 @@ def check_eligibility():
         flash('Please enter a valid 17-character VIN', 'error')
         return redirect(url_for('index'))
     
-    # Decode VIN
-    vehicle_info = vin_decoder.decode_vin(vin)
-    if not vehicle_info:
-        flash('Unable to decode VIN. Please check the VIN and try again.', 'error')
-        return redirect(url_for('index'))
-    
-    # Check eligibility
-    eligibility_result = eligibility_checker.check_full_eligibility(vehicle_info, mileage)
-    
-    # Log to Supabase (optional - will not fail if Supabase is not configured)
-    supabase_logger.log_vin_check(vin, mileage, vehicle_info, eligibility_result)
-    
-    # Calculate earnings estimate if eligible
-    earnings_estimate = None
-    if eligibility_result.get('eligible', False):
-        earnings_estimate = supabase_logger.get_earnings_estimate(
-            vehicle_info.get('make', ''),
-            vehicle_info.get('model', ''),
-            vehicle_info.get('year', 0)
-        )
+    result_key = (vin, mileage, eligibility_checker.rule_version)
+    cached_result = check_result_cache.get(result_key)
+    if cached_result:
+        # Same VIN and mileage under the same rules: reuse the whole result, no decode, log or earnings query
+        vehicle_info, eligibility_result, earnings_estimate = cached_result
+    else:
+        # Offline pre-screen: check digit and model year code, no network call
+        prescreen = vin_decoder.prescreen(vin, eligibility_checker.max_vehicle_age,
+                                          eligibility_checker.current_year)
+        if prescreen['status'] == 'invalid_check_digit':
+            flash('This VIN has an invalid check digit. Please check the VIN and try again.', 'error')
+            return redirect(url_for('index'))
+        
+        if prescreen['status'] == 'too_old':
+            # The year code alone proves the vehicle is over the age limit
+            vehicle_info = {
+                'make': None,
+                'model': None,
+                'year': prescreen['model_year'],
+                'body_class': None,
+                'title_status': 'Unknown - Verification Required'
+            }
+            eligibility_result = eligibility_checker.build_age_rejection(prescreen['model_year'], mileage)
+        else:
+            # Decode VIN
+            vehicle_info = vin_decoder.decode_vin(vin)
+            if not vehicle_info:
+                if vin_decoder.breaker.is_open():
+                    flash('The VIN decoding service is temporarily unavailable. Please try again in a minute.', 'error')
+                else:
+                    flash('Unable to decode VIN. Please check the VIN and try again.', 'error')
+                return redirect(url_for('index'))
+            
+            # Check eligibility
+            eligibility_result = eligibility_checker.check_full_eligibility(vehicle_info, mileage)
+        
+        # Log to Supabase (optional - will not fail if Supabase is not configured)
+        supabase_logger.log_vin_check(vin, mileage, vehicle_info, eligibility_result)
+        
+        # Calculate earnings estimate if eligible
+        earnings_estimate = None
+        if eligibility_result.get('eligible', False):
+            earnings_estimate = supabase_logger.get_earnings_estimate(
+                vehicle_info.get('make', ''),
+                vehicle_info.get('model', ''),
+                vehicle_info.get('year', 0)
+            )
+        
+        check_result_cache.set(result_key, (vehicle_info, eligibility_result, earnings_estimate))
     
     # Store vehicle data in session for potential listing creation
     session['last_check'] = {
@@ -207,6 +310,37 @@ def check_eligibility():
                          eligibility_result=eligibility_result,
                          earnings_estimate=earnings_estimate)
 
+@app.route('/fleet-check', methods=['GET', 'POST'])
+@paid_user_required
+def fleet_check():
+    """Upload a CSV of VIN,mileage rows and stream back eligibility and earnings per vehicle"""
+    if request.method == 'GET':
+        return render_template('fleet_check.html')
+    
+    upload = request.files.get('file')
+    if not upload or not upload.filename:
+        flash('Please choose a CSV file with vin and mileage columns', 'error')
+        return redirect(url_for('fleet_check'))
+    
+    # Werkzeug spools large uploads to disk; wrap the file so rows are read one at a time
+    try:
+        rows = read_fleet_csv(io.TextIOWrapper(upload.stream, encoding='utf-8-sig', newline=''))
+    except (ValueError, UnicodeDecodeError) as e:
+        flash(f'Could not read CSV: {e}', 'error')
+        return redirect(url_for('fleet_check'))
+    
+    pipeline = FleetPipeline(vin_decoder, eligibility_checker, supabase_logger.get_earnings_estimate)
+    results = pipeline.run(rows)
+    
+    base_name = os.path.splitext(secure_filename(upload.filename))[0] or 'fleet'
+    if request.form.get('format') == 'ndjson':
+        body, mimetype, filename = format_ndjson(results), 'application/x-ndjson', f"{base_name}_eligibility.ndjson"
+    else:
+        body, mimetype, filename = format_csv(results), 'text/csv', f"{base_name}_eligibility.csv"
+    
+    return Response(stream_with_context(body), mimetype=mimetype,
+                    headers={'Content-Disposition': f'attachment; filename="{filename}"'})
+
 @app.route('/admin')
 def admin():
     """Admin page showing recent checks (optional)"""
@@ -217,6 +351,39 @@ def admin():
     recent_checks = supabase_logger.get_recent_checks(25)
     return render_template('admin.html', recent_checks=recent_checks)
 
+@app.route('/admin/refresh-earnings', methods=['POST'])
+@login_required
+def admin_refresh_earnings():
+    """Reload this worker's in-memory earnings table (other workers refresh on their interval)"""
+    if not supabase_logger.is_connected():
+        return jsonify({'refreshed': False, 'error': 'Database not configured'}), 503
+    
+    refreshed = supabase_logger.refresh_earnings_table()
+    return jsonify({
+        'refreshed': refreshed,
+        'earnings_table': supabase_logger.earnings_table.get_stats()
+    }), 200 if refreshed else 502
+
+@app.route('/admin/earnings-estimate')
+@login_required
+def admin_earnings_estimate():
+    """Estimate for one make/model/year; fresh=1 resolves it in the database instead of the in-memory table"""
+    make = request.args.get('make', '').strip()
+    model = request.args.get('model', '').strip()
+    year = request.args.get('year', type=int)
+    fresh = request.args.get('fresh') == '1'
+    
+    if not make:
+        return jsonify({'error': 'make is required'}), 400
+    
+    return jsonify({
+        'make': make,
+        'model': model,
+        'year': year,
+        'fresh': fresh,
+        'estimated_monthly_earning': supabase_logger.get_earnings_estimate(make, model, year, use_cache=not fresh)
+    })
+
 # Authentication routes
 @app.route('/login', methods=['GET', 'POST'])
 def login():
@@ -346,11 +513,12 @@ def migrate_database():
             'supabase_connected': False
         })
     
-    success = migrate_cached_listings_to_database()
+    stats = migrate_cached_listings_to_database(restart=request.args.get('restart') == '1')
     
     return jsonify({
-        'success': success,
-        'message': f'Migration {"completed" if success else "failed"}',
+        'success': stats['success'],
+        'message': f'Migration {"completed" if stats["success"] else "failed"}',
+        'migration': stats,
         'cached_listings_found': cached_count,
         'global_cache_users': list(GLOBAL_USER_LISTINGS.keys()),
         'supabase_connected': supabase_logger.is_connected()
@@ -367,6 +535,29 @@ def debug_cache():
         'supabase_connected': supabase_logger.is_connected()
     })
 
+@app.route('/health')
+def health():
+    """Health check including the NHTSA circuit breaker state"""
+    breaker_state = vin_decoder.breaker.get_state()
+    return jsonify({
+        'status': 'ok' if breaker_state['state'] == 'closed' else 'degraded',
+        'nhtsa_circuit_breaker': breaker_state,
+        'eligibility_rule_version': eligibility_checker.rule_version,
+        'vin_check_writer': supabase_logger.vin_check_writer.get_stats() if supabase_logger.vin_check_writer else None,
+        'supabase_connected': supabase_logger.is_connected(),
+        'supabase_clients': get_client_stats()
+    })
+
+@app.route('/debug-check-cache')
+def debug_check_cache():
+    """Debug /check result cache counters"""
+    return jsonify(check_result_cache.get_stats())
+
+@app.route('/debug-vin-decoder')
+def debug_vin_decoder():
+    """Debug VIN decoder cache counters"""
+    return jsonify(vin_decoder.get_stats())
+
 @app.route('/debug-session')
 def debug_session_state():
     """Debug current session state"""
@@ -454,19 +645,27 @@ def marketplace():
     if session_listings:
         session['all_listings'] = session_listings
     
-    # Try to get listings from database
+    # Try to get listing cards from database, one keyset page at a time
+    cursor, per_page = get_page_args()
     listings = []
+    next_cursor = None
     try:
-        db_listings = supabase_logger.get_active_listings()
+        db_listings = supabase_logger.get_listing_summaries(limit=per_page, cursor=cursor)
         print(f"Database marketplace returned {len(db_listings)} listings")
         listings.extend(db_listings)
+        next_cursor = getattr(db_listings, 'next_cursor', None)
     except Exception as e:
         print(f"Failed to get database listings: {e}")
     
+    if cursor:
+        # Later pages are database-only; session and cached listings are shown on the first page
+        return render_template('marketplace.html', listings=listings, next_cursor=next_cursor,
+                               cursor=cursor, per_page=per_page)
+    
     # Add session listings
     if session_listings:
         print(f"Adding {len(session_listings)} session listings to marketplace")
-        listings.extend(session_listings)
+        listings.extend(summarize_listing(l) for l in session_listings)
     else:
         print("No session marketplace listings found")
     
@@ -478,15 +677,16 @@ def marketplace():
         existing_ids = {l.get('id') for l in listings}
         for cached_listing in cached_listings:
             if cached_listing.get('id') not in existing_ids:
-                listings.append(cached_listing)
+                listings.append(summarize_listing(cached_listing))
     
     # If still no listings, show sample ones
     if not listings:
         print("No listings found, using samples")
-        listings = supabase_logger._get_sample_listings()
+        listings = [summarize_listing(l) for l in supabase_logger._get_sample_listings()]
     
     print(f"Showing {len(listings)} total listings in marketplace")
-    return render_template('marketplace.html', listings=listings)
+    return render_template('marketplace.html', listings=listings, next_cursor=next_cursor,
+                           cursor=cursor, per_page=per_page)
 
 @app.route('/list-vehicle')
 @paid_user_required
@@ -695,11 +895,14 @@ def my_listings():
     session['user_listings'] = all_user_listings
     save_user_listings_to_cache(user_id, all_user_listings)
     
-    # Try to get listings from database
+    # Try to get listings from database, one keyset page at a time
+    cursor, per_page = get_page_args()
     db_listings = []
+    next_cursor = None
     try:
-        db_listings = supabase_logger.get_user_listings(user_id)
+        db_listings = supabase_logger.get_user_listings(user_id, limit=per_page, cursor=cursor)
         print(f"Database returned {len(db_listings)} listings")
+        next_cursor = getattr(db_listings, 'next_cursor', None)
     except Exception as e:
         print(f"Failed to get database user listings: {e}")
     
@@ -707,8 +910,8 @@ def my_listings():
     final_listings = []
     seen_ids = set()
     
-    # Add cached/session listings first (these are most up-to-date)
-    for listing in all_user_listings:
+    # Add cached/session listings first (these are most up-to-date); later pages are database-only
+    for listing in ([] if cursor else all_user_listings):
         if listing.get('id') not in seen_ids:
             final_listings.append(listing)
             seen_ids.add(listing.get('id'))
@@ -727,7 +930,8 @@ def my_listings():
         print(f"  Images: {listing.get('images', 'No images key')}")
         print(f"  Images length: {len(listing.get('images', []))}")
     
-    return render_template('my_listings.html', listings=final_listings)
+    return render_template('my_listings.html', listings=final_listings, next_cursor=next_cursor,
+                           cursor=cursor, per_page=per_page)
 
 @app.route('/toggle-listing/<listing_id>')
 @login_required
@@ -786,14 +990,11 @@ def contact_seller():
                     print(f"Found listing in cache: {listing.get('year')} {listing.get('make')} {listing.get('model')}")
                     break
         
-        # 3. Check database
+        # 3. Check database (full row by id; the marketplace only loads card summaries)
         if not listing:
-            db_listings = supabase_logger.get_active_listings()
-            for l in db_listings:
-                if l.get('id') == listing_id:
-                    listing = l
-                    print(f"Found listing in database: {listing.get('year')} {listing.get('make')} {listing.get('model')}")
-                    break
+            listing = supabase_logger.get_listing(listing_id)
+            if listing:
+                print(f"Found listing in database: {listing.get('year')} {listing.get('make')} {listing.get('model')}")
         
         if not listing:
             print(f"Listing {listing_id} not found in any source")
@@ -858,8 +1059,10 @@ def seller_requests():
     """Show contact requests for the current user (as seller)"""
     user_id = get_current_user_id()
     
-    # Get requests from database
-    db_requests = supabase_logger.get_seller_requests(user_id)
+    # Get requests from database, one keyset page at a time
+    cursor, per_page = get_page_args()
+    db_requests = supabase_logger.get_seller_requests(user_id, limit=per_page, cursor=cursor)
+    next_cursor = getattr(db_requests, 'next_cursor', None)
     print(f"Found {len(db_requests)} database seller requests for user {user_id}")
     
     # Get requests from session storage
@@ -881,8 +1084,11 @@ def seller_requests():
     for req in global_seller_requests:
         print(f"  Global seller request: {req.get('id')} from {req.get('buyer_email')} - status: {req.get('status')}")
     
-    # Combine all requests (global + session + database)
-    all_requests = global_seller_requests + session_seller_requests + db_requests
+    # Combine all requests (global + session + database); later pages are database-only
+    if cursor:
+        all_requests = list(db_requests)
+    else:
+        all_requests = global_seller_requests + session_seller_requests + db_requests
     
     # Remove duplicates by ID
     seen_ids = set()
@@ -894,7 +1100,8 @@ def seller_requests():
     
     print(f"Total unique seller requests: {len(unique_requests)}")
     
-    return render_template('seller_requests.html', requests=unique_requests)
+    return render_template('seller_requests.html', requests=unique_requests, next_cursor=next_cursor,
+                           cursor=cursor, per_page=per_page)
 
 @app.route('/my-requests')
 @login_required
@@ -902,8 +1109,10 @@ def buyer_requests():
     """Show contact requests made by the current user (as buyer)"""
     user_id = get_current_user_id()
     
-    # Get requests from database
-    db_requests = supabase_logger.get_buyer_requests(user_id)
+    # Get requests from database, one keyset page at a time
+    cursor, per_page = get_page_args()
+    db_requests = supabase_logger.get_buyer_requests(user_id, limit=per_page, cursor=cursor)
+    next_cursor = getattr(db_requests, 'next_cursor', None)
     print(f"Found {len(db_requests)} database buyer requests for user {user_id}")
     
     # Get requests from session storage
@@ -925,8 +1134,11 @@ def buyer_requests():
     for req in global_buyer_requests:
         print(f"  Global buyer request: {req.get('id')} to seller {req.get('seller_id')} - status: {req.get('status')}")
     
-    # Combine all requests (global + session + database)
-    all_requests = global_buyer_requests + session_buyer_requests + db_requests
+    # Combine all requests (global + session + database); later pages are database-only
+    if cursor:
+        all_requests = list(db_requests)
+    else:
+        all_requests = global_buyer_requests + session_buyer_requests + db_requests
     
     # Remove duplicates by ID
     seen_ids = set()
@@ -938,7 +1150,8 @@ def buyer_requests():
     
     print(f"Total unique buyer requests: {len(unique_requests)}")
     
-    return render_template('buyer_requests.html', requests=unique_requests)
+    return render_template('buyer_requests.html', requests=unique_requests, next_cursor=next_cursor,
+                           cursor=cursor, per_page=per_page)
 
 @app.route('/respond-request/<request_id>/<action>')
 @login_required
@@ -3,7 +3,7 @@ from flask import session, request, redirect, url_for, flash
 import os
 import stripe
 from dotenv import load_dotenv
-from supabase_client import SupabaseLogger
+from supabase_client import SupabaseLogger, get_supabase_logger
 
 # Ensure environment variables are loaded
 load_dotenv()
@@ -152,7 +152,7 @@ def handle_stripe_webhook(payload, sig_header):
         user_email = session_data['metadata']['user_email']
         
         # Update user payment status in database
-        supabase_client = SupabaseLogger()
+        supabase_client = get_supabase_logger()
         user = supabase_client.create_or_get_user(user_email)
         if user:
             supabase_client.update_user_payment_status(user['id'], True)
@@ -167,7 +167,7 @@ def handle_stripe_webhook(payload, sig_header):
         user_email = customer['email']
         
         # Update user payment status in database
-        supabase_client = SupabaseLogger()
+        supabase_client = get_supabase_logger()
         user = supabase_client.create_or_get_user(user_email)
         if user:
             supabase_client.update_user_payment_status(user['id'], False)
@@ -0,0 +1,209 @@
+"""Re-screen stored or listed VINs offline, e.g. nightly after the model year rolls over.
+
+    python batch_check.py --source db --write-db
+    python batch_check.py --file fleet.csv --output results.ndjson --workers 8
+
+VINs are decoded in the main process (cache, local vPIC, batched NHTSA calls);
+eligibility and earnings run across a process pool, and results are written
+with multi-row inserts into vin_checks and/or an NDJSON/CSV file.
+"""
+import argparse
+import os
+import sys
+import time
+from collections import deque
+from contextlib import ExitStack
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Dict, Iterator, List, Optional
+
+from dotenv import load_dotenv
+
+from fleet_pipeline import RESULT_COLUMNS, format_csv, format_ndjson, read_fleet_csv
+from vin_cache import VINCache
+from vin_utils import VINDecoder
+
+load_dotenv()
+
+DEFAULT_CHUNK_SIZE = 1000
+
+# Per-process state, built once by _init_worker
+_worker = {}
+
+
+def _init_worker(with_earnings: bool):
+    from eligibility_rules import TuroEligibilityChecker
+    _worker['checker'] = TuroEligibilityChecker()
+    _worker['earnings'] = None
+    if with_earnings:
+        import threading
+        import supabase_client
+        # A forked worker inherits the parent's logger (HTTP/2 sockets, locks held by its threads);
+        # drop it so this process opens its own connections instead of sharing the parent's
+        supabase_client._shared_logger = None
+        supabase_client._shared_logger_lock = threading.Lock()
+        _worker['earnings'] = supabase_client.get_supabase_logger().get_earnings_estimate
+    _worker['earnings_memo'] = {}
+
+
+def _estimate_earnings(vehicle_info: Dict) -> Optional[int]:
+    key = (vehicle_info.get('make', ''), vehicle_info.get('model', ''), vehicle_info.get('year', 0))
+    memo = _worker['earnings_memo']
+    if key not in memo:
+        memo[key] = _worker['earnings'](*key)
+    return memo[key]
+
+
+def check_decoded(items: List[Dict]) -> List[Dict]:
+    """Worker: eligibility (and earnings) for decoded rows of {'row', 'vin', 'mileage', 'vehicle_info', 'error'}"""
+    checker = _worker['checker']
+    results = []
+    for item in items:
+        result = {column: None for column in RESULT_COLUMNS}
+        result.update(row=item['row'], vin=item['vin'], mileage=item['mileage'], error=item['error'])
+        vehicle_info = item['vehicle_info']
+
+        if vehicle_info and not item['error']:
+            eligibility = checker.check_full_eligibility(vehicle_info, item['mileage'])
+            result.update(
+                year=vehicle_info.get('year'),
+                make=vehicle_info.get('make'),
+                model=vehicle_info.get('model'),
+                eligible=eligibility['eligible'],
+                reasons=eligibility['reasons'],
+                rule_version=eligibility['rule_version']
+            )
+            if eligibility['eligible'] and _worker['earnings']:
+                result['earnings_estimate'] = _estimate_earnings(vehicle_info)
+            # Kept for the bulk vin_checks insert; dropped before file output
+            result['_vehicle_info'] = vehicle_info
+            result['_eligibility'] = eligibility
+        results.append(result)
+    return results
+
+
+def read_db_vehicles(supabase_logger, tables: List[str]) -> Iterator[Dict]:
+    """Distinct VINs across the given tables, with the first mileage seen for each"""
+    seen = set()
+    row_number = 0
+    for table in tables:
+        for record in supabase_logger.iter_vehicles(table):
+            vin = (record.get('vin') or '').strip().upper()
+            if not vin or vin in seen:
+                continue
+            seen.add(vin)
+            row_number += 1
+            yield {'row': row_number, 'vin': vin, 'mileage': record.get('mileage') or 0, 'error': None}
+
+
+def decode_chunks(decoder: VINDecoder, rows: Iterator[Dict], chunk_size: int) -> Iterator[List[Dict]]:
+    """Decode rows a chunk at a time through the batch decoder"""
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        decodable = [row for row in chunk if not row['error']]
+        decoded = decoder.decode_vins([row['vin'] for row in decodable])
+        for row, result in zip(decodable, decoded):
+            row['vehicle_info'] = result['vehicle_info']
+            if not result['vehicle_info']:
+                row['error'] = result['error'] or 'Unable to decode VIN'
+        for row in chunk:
+            row.setdefault('vehicle_info', None)
+        yield chunk
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Re-screen VINs for Turo eligibility in bulk')
+    parser.add_argument('--file', help='CSV with vin and mileage columns')
+    parser.add_argument('--source', choices=['vin_checks', 'listings', 'db'],
+                        help="Read VINs from Supabase ('db' = vin_checks and listings)")
+    parser.add_argument('--output', help='Write results to this .csv or .ndjson file')
+    parser.add_argument('--write-db', action='store_true', help='Insert results into vin_checks')
+    parser.add_argument('--no-earnings', action='store_true', help='Skip earnings estimates')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 2)
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    if bool(args.file) == bool(args.source):
+        parser.error('pass exactly one of --file or --source')
+
+    supabase_logger = None
+    if args.source or args.write_db:
+        from supabase_client import get_supabase_logger
+        supabase_logger = get_supabase_logger()
+        if not supabase_logger.is_connected():
+            print("❌ Supabase not connected - check SUPABASE_URL and SUPABASE_ANON_KEY")
+            sys.exit(1)
+
+    with ExitStack() as files:
+        if args.file:
+            try:
+                rows = read_fleet_csv(files.enter_context(open(args.file, newline='', encoding='utf-8-sig')))
+            except (OSError, ValueError) as e:
+                print(f"❌ {e}")
+                sys.exit(1)
+        else:
+            tables = ['vin_checks', 'listings'] if args.source == 'db' else [args.source]
+            rows = read_db_vehicles(supabase_logger, tables)
+
+        output = None
+        if args.output:
+            output = files.enter_context(open(args.output, 'w', newline=''))
+            format_output = format_ndjson if args.output.endswith('.ndjson') else format_csv
+
+        decoder = VINDecoder(cache=VINCache())
+        started = time.time()
+        stats = {'processed': 0, 'eligible': 0, 'errors': 0, 'logged': 0}
+
+        def write_results(results: List[Dict]):
+            if args.write_db:
+                stats['logged'] += supabase_logger.log_vin_checks([
+                    {'vin': r['vin'], 'mileage': r['mileage'],
+                     'vehicle_info': r['_vehicle_info'], 'eligibility_result': r['_eligibility']}
+                    for r in results if r.get('_eligibility')
+                ])
+
+            for result in results:
+                result.pop('_vehicle_info', None)
+                result.pop('_eligibility', None)
+            if output:
+                lines = format_output(results)
+                if format_output is format_csv and stats['processed']:
+                    next(lines)  # CSV header only once
+                output.writelines(lines)
+
+            stats['processed'] += len(results)
+            stats['eligible'] += sum(1 for r in results if r['eligible'])
+            stats['errors'] += sum(1 for r in results if r['error'])
+            elapsed = time.time() - started
+            print(f"⏳ {stats['processed']:,} VINs  {stats['processed'] / elapsed:,.0f}/s  "
+                  f"eligible {stats['eligible']:,}  errors {stats['errors']:,}  logged {stats['logged']:,}", flush=True)
+
+        worker_chunk = max(1, args.chunk_size // args.workers)
+        in_flight = deque()  # futures per decoded chunk, oldest first
+
+        with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker,
+                                 initargs=(not args.no_earnings,)) as executor:
+            # Decode chunk N+1 in this process while workers check chunk N; at most two chunks in flight
+            for chunk in decode_chunks(decoder, rows, args.chunk_size):
+                in_flight.append([executor.submit(check_decoded, chunk[i:i + worker_chunk])
+                                  for i in range(0, len(chunk), worker_chunk)])
+                if len(in_flight) > 1:
+                    write_results([r for future in in_flight.popleft() for r in future.result()])
+
+            while in_flight:
+                write_results([r for future in in_flight.popleft() for r in future.result()])
+
+    elapsed = time.time() - started
+    print(f"✅ Re-screened {stats['processed']:,} VINs in {elapsed:.1f}s "
+          f"({stats['processed'] / max(elapsed, 1e-9):,.0f}/s): {stats['eligible']:,} eligible, "
+          f"{stats['errors']:,} errors, {stats['logged']:,} written to vin_checks")
+    decoder_stats = decoder.get_stats()
+    print(f"   decoder: {decoder_stats['batch_requests']:,} batch requests "
+          f"({decoder_stats['batch_decoded_vins']:,} VINs decoded), {decoder_stats['local_decodes']:,} local, "
+          f"memory cache hit ratio {decoder_stats['cache']['memory']['hit_ratio']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,222 @@
+"""Benchmark fallback earnings estimates: the original per-call dict lookup vs. the compiled EarningsModel.
+
+    python bench_earnings_model.py --vehicles 20000
+
+Prices a mix of specific models, brand-only makes and unknown makes across
+model years with the original _get_fallback_earnings (reproduced below as
+the baseline, with its fixed current year of 2025) and with
+EarningsModel(current_year=2025), one call at a time and as one
+estimate_many() batch. Results are checked to match first, except for
+Honda CR-V and Ford F-150, which the original never matched to their
+specific rates.
+"""
+import argparse
+import random
+import time
+
+from earnings_model import EarningsModel
+
+# --- Original implementation (supabase_client._get_fallback_earnings), kept as the baseline ---
+def legacy_fallback_earnings(make: str, model: str, year: int) -> int:
+    """Accurate earnings estimates based on real Turo market data"""
+    make_upper = make.upper()
+    model_upper = model.upper()
+    current_year = 2025
+    age = current_year - year
+
+    # Specific vehicle model overrides based on actual Turo performance
+    specific_models = {
+        # Tesla models - high demand electric vehicles
+        ('TESLA', 'MODEL_3'): {'base': 1800, 'age_penalty': 150},
+        ('TESLA', 'MODEL_Y'): {'base': 2200, 'age_penalty': 180},
+        ('TESLA', 'MODEL_S'): {'base': 2500, 'age_penalty': 200},
+        ('TESLA', 'MODEL_X'): {'base': 2800, 'age_penalty': 220},
+
+        # Luxury SUVs - high earning potential
+        ('BMW', 'X3'): {'base': 1600, 'age_penalty': 120},
+        ('BMW', 'X5'): {'base': 1900, 'age_penalty': 140},
+        ('MERCEDES', 'GLC'): {'base': 1700, 'age_penalty': 125},
+        ('MERCEDES', 'GLE'): {'base': 2000, 'age_penalty': 145},
+        ('AUDI', 'Q5'): {'base': 1500, 'age_penalty': 115},
+        ('AUDI', 'Q7'): {'base': 1800, 'age_penalty': 135},
+        ('LEXUS', 'RX'): {'base': 1400, 'age_penalty': 110},
+        ('LEXUS', 'GX'): {'base': 1700, 'age_penalty': 130},
+
+        # Popular economy models - reliable earners
+        ('HONDA', 'CIVIC'): {'base': 900, 'age_penalty': 60},
+        ('HONDA', 'ACCORD'): {'base': 1100, 'age_penalty': 70},
+        ('HONDA', 'CR-V'): {'base': 1200, 'age_penalty': 75},
+        ('HONDA', 'PILOT'): {'base': 1400, 'age_penalty': 85},
+        ('TOYOTA', 'CAMRY'): {'base': 1000, 'age_penalty': 65},
+        ('TOYOTA', 'COROLLA'): {'base': 850, 'age_penalty': 55},
+        ('TOYOTA', 'RAV4'): {'base': 1300, 'age_penalty': 80},
+        ('TOYOTA', 'HIGHLANDER'): {'base': 1500, 'age_penalty': 90},
+        ('TOYOTA', 'PRIUS'): {'base': 950, 'age_penalty': 60},
+
+        # Mid-range popular models
+        ('NISSAN', 'ALTIMA'): {'base': 950, 'age_penalty': 65},
+        ('NISSAN', 'ROGUE'): {'base': 1100, 'age_penalty': 70},
+        ('HYUNDAI', 'ELANTRA'): {'base': 850, 'age_penalty': 55},
+        ('HYUNDAI', 'TUCSON'): {'base': 1050, 'age_penalty': 70},
+        ('KIA', 'FORTE'): {'base': 800, 'age_penalty': 50},
+        ('KIA', 'SORENTO'): {'base': 1150, 'age_penalty': 75},
+
+        # American brands
+        ('FORD', 'F-150'): {'base': 1600, 'age_penalty': 100},
+        ('FORD', 'ESCAPE'): {'base': 1000, 'age_penalty': 70},
+        ('FORD', 'EXPLORER'): {'base': 1300, 'age_penalty': 85},
+        ('CHEVROLET', 'MALIBU'): {'base': 900, 'age_penalty': 60},
+        ('CHEVROLET', 'EQUINOX'): {'base': 1050, 'age_penalty': 70},
+        ('CHEVROLET', 'TAHOE'): {'base': 1800, 'age_penalty': 120},
+        ('JEEP', 'WRANGLER'): {'base': 1500, 'age_penalty': 90},
+        ('JEEP', 'GRAND_CHEROKEE'): {'base': 1350, 'age_penalty': 85},
+    }
+
+    # Check for specific model match
+    model_key = model_upper.replace(' ', '_').replace('-', '_')
+    if (make_upper, model_key) in specific_models:
+        data = specific_models[(make_upper, model_key)]
+        base_earnings = data['base']
+        age_penalty = data['age_penalty']
+
+        # Apply age depreciation
+        depreciated_earnings = max(base_earnings - (age * age_penalty), base_earnings * 0.3)
+        return int(depreciated_earnings)
+
+    # Brand-based fallback with more accurate data
+    brand_data = {
+        # Ultra-luxury brands
+        'LAMBORGHINI': {'base': 4000, 'age_penalty': 300},
+        'FERRARI': {'base': 4500, 'age_penalty': 350},
+        'MCLAREN': {'base': 4200, 'age_penalty': 320},
+        'BENTLEY': {'base': 3500, 'age_penalty': 280},
+        'ROLLS-ROYCE': {'base': 4000, 'age_penalty': 300},
+        'MASERATI': {'base': 2800, 'age_penalty': 220},
+        'PORSCHE': {'base': 2600, 'age_penalty': 200},
+
+        # Premium luxury brands
+        'BMW': {'base': 1500, 'age_penalty': 110},
+        'MERCEDES': {'base': 1550, 'age_penalty': 115},
+        'MERCEDES-BENZ': {'base': 1550, 'age_penalty': 115},
+        'AUDI': {'base': 1400, 'age_penalty': 105},
+        'LEXUS': {'base': 1300, 'age_penalty': 95},
+        'CADILLAC': {'base': 1200, 'age_penalty': 90},
+        'LINCOLN': {'base': 1150, 'age_penalty': 85},
+        'ACURA': {'base': 1100, 'age_penalty': 80},
+        'INFINITI': {'base': 1050, 'age_penalty': 75},
+        'GENESIS': {'base': 1200, 'age_penalty': 85},
+
+        # Tesla - electric premium
+        'TESLA': {'base': 2000, 'age_penalty': 160},
+
+        # Reliable economy brands
+        'HONDA': {'base': 1000, 'age_penalty': 65},
+        'TOYOTA': {'base': 1050, 'age_penalty': 70},
+        'MAZDA': {'base': 950, 'age_penalty': 60},
+        'SUBARU': {'base': 1000, 'age_penalty': 65},
+
+        # Mid-tier brands
+        'NISSAN': {'base': 950, 'age_penalty': 65},
+        'HYUNDAI': {'base': 900, 'age_penalty': 60},
+        'KIA': {'base': 850, 'age_penalty': 55},
+        'VOLKSWAGEN': {'base': 1000, 'age_penalty': 70},
+        'VOLVO': {'base': 1100, 'age_penalty': 75},
+
+        # American brands
+        'FORD': {'base': 950, 'age_penalty': 70},
+        'CHEVROLET': {'base': 900, 'age_penalty': 65},
+        'GMC': {'base': 1000, 'age_penalty': 70},
+        'DODGE': {'base': 850, 'age_penalty': 60},
+        'CHRYSLER': {'base': 800, 'age_penalty': 55},
+        'JEEP': {'base': 1100, 'age_penalty': 75},
+        'RAM': {'base': 1200, 'age_penalty': 80},
+        'BUICK': {'base': 850, 'age_penalty': 60},
+
+        # Electric vehicle brands
+        'RIVIAN': {'base': 2200, 'age_penalty': 180},
+        'LUCID': {'base': 2800, 'age_penalty': 220},
+        'POLESTAR': {'base': 1600, 'age_penalty': 120},
+    }
+
+    # Apply brand-based calculation
+    if make_upper in brand_data:
+        data = brand_data[make_upper]
+        base_earnings = data['base']
+        age_penalty = data['age_penalty']
+    else:
+        # Unknown brand default
+        base_earnings = 800
+        age_penalty = 60
+
+    # Apply age depreciation with minimum floor
+    depreciated_earnings = max(base_earnings - (age * age_penalty), base_earnings * 0.25)
+
+    # Apply additional factors
+
+    # Recent model year bonus
+    if year >= 2022:
+        depreciated_earnings *= 1.15
+    elif year >= 2020:
+        depreciated_earnings *= 1.05
+
+    # Very old vehicle penalty
+    if age > 15:
+        depreciated_earnings *= 0.7
+    elif age > 10:
+        depreciated_earnings *= 0.85
+
+    return int(depreciated_earnings)
+
+# --- Inputs ---
+
+# Specific models, brand-only models and an unknown make, spelled as vPIC decodes them
+SAMPLE_VEHICLES = [
+    ('TESLA', 'Model 3'), ('Tesla', 'Model Y'), ('BMW', 'X5'), ('HONDA', 'Accord'), ('Honda', 'Civic'),
+    ('TOYOTA', 'Camry'), ('Toyota', 'RAV4'), ('JEEP', 'Grand Cherokee'), ('Ford', 'Mustang'),
+    ('CHEVROLET', 'Silverado'), ('Porsche', 'Cayenne'), ('MAZDA', 'CX-5'), ('Rivian', 'R1S'),
+    ('MERCEDES-BENZ', 'C-Class'), ('Scion', 'xB'), ('HONDA', 'CR-V'), ('FORD', 'F-150'),
+]
+
+# Specific rates the original could never match ('CR-V' vs the normalized 'CR_V')
+NEWLY_MATCHED = {('HONDA', 'CR-V'), ('FORD', 'F-150')}
+
+
+def per_call(label, count, func):
+    started = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - started
+    print(f"{label:<44} {elapsed * 1e6 / count:8.2f} us/vehicle")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark fallback earnings before/after EarningsModel')
+    parser.add_argument('--vehicles', type=int, default=20000)
+    args = parser.parse_args()
+
+    random.seed(7)
+    vehicles = [(*random.choice(SAMPLE_VEHICLES), random.randint(1995, 2025)) for _ in range(args.vehicles)]
+    makes, models, years = (list(column) for column in zip(*vehicles))
+    model = EarningsModel(current_year=2025)
+
+    batch = model.estimate_many(makes, models, years)
+    for (make, model_name, year), batched in zip(vehicles, batch):
+        after = model.estimate(make, model_name, year)
+        assert after == batched, (make, model_name, year)
+        if (make.upper(), model_name.upper()) not in NEWLY_MATCHED:
+            assert legacy_fallback_earnings(make, model_name, year) == after, (make, model_name, year)
+    print(f"{args.vehicles} vehicles: estimates identical to the original "
+          f"(except {', '.join(' '.join(pair) for pair in sorted(NEWLY_MATCHED))})\n")
+
+    before = per_call('_get_fallback_earnings (before)', args.vehicles,
+                      lambda: [legacy_fallback_earnings(make, name, year) for make, name, year in vehicles])
+    after = per_call('EarningsModel.estimate', args.vehicles,
+                     lambda: [model.estimate(make, name, year) for make, name, year in vehicles])
+    print(f"{'':<44} {before / after:8.1f}x faster")
+    after = per_call('EarningsModel.estimate_many', args.vehicles,
+                     lambda: model.estimate_many(makes, models, years))
+    print(f"{'':<44} {before / after:8.1f}x faster")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+"""Benchmark earnings resolution against a local Postgres: two-query chain vs. resolve_earnings_estimate().
+
+    python bench_earnings_rpc.py --dsn postgresql://localhost/turo_bench --rtt-ms 20
+
+Creates earnings_lookup plus the resolve_earnings_estimate() function from
+setup_database.sql in the target database, loads sample rows, then times
+the old exact/make-only chain (two sequential round trips, as PostgREST
+issues them) against a single function call. --rtt-ms adds a simulated
+network round trip per query to model a remote Supabase project.
+Requires psycopg2 (pip install psycopg2-binary).
+"""
+import argparse
+import os
+import random
+import re
+import time
+
+SETUP_SQL = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'setup_database.sql')
+
+EARNINGS_TABLE_DDL = """
+CREATE TABLE IF NOT EXISTS earnings_lookup (
+  id SERIAL PRIMARY KEY,
+  make TEXT NOT NULL,
+  model TEXT,
+  year_range TEXT,
+  estimated_monthly_earning INTEGER NOT NULL,
+  created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+CREATE INDEX IF NOT EXISTS idx_earnings_lookup_make_model ON earnings_lookup(make, model);
+"""
+
+SAMPLE_MAKES = ['HONDA', 'TOYOTA', 'BMW', 'MERCEDES', 'TESLA', 'FORD', 'CHEVROLET', 'KIA', 'HYUNDAI', 'NISSAN']
+SAMPLE_MODELS = ['ACCORD', 'CIVIC', 'CAMRY', 'COROLLA', 'MODEL 3', 'F-150', 'MALIBU', 'SOUL', 'X5', 'ROGUE']
+
+
+def load_function_sql() -> str:
+    with open(SETUP_SQL) as f:
+        match = re.search(r"CREATE OR REPLACE FUNCTION resolve_earnings_estimate.*?\$\$;", f.read(), re.DOTALL)
+    if not match:
+        raise RuntimeError(f"resolve_earnings_estimate not found in {SETUP_SQL}")
+    return match.group(0)
+
+
+def chain(cursor, make, model, year, rtt):
+    time.sleep(rtt)
+    cursor.execute("SELECT estimated_monthly_earning FROM earnings_lookup WHERE make = %s AND model = %s",
+                   (make.upper(), model.upper()))
+    row = cursor.fetchone()
+    if row:
+        return row[0]
+    time.sleep(rtt)
+    cursor.execute("SELECT estimated_monthly_earning FROM earnings_lookup WHERE make = %s AND model IS NULL",
+                   (make.upper(),))
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def rpc(cursor, make, model, year, rtt):
+    time.sleep(rtt)
+    cursor.execute("SELECT resolve_earnings_estimate(%s, %s, %s)", (make, model, year))
+    return cursor.fetchone()[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark earnings resolution strategies against Postgres')
+    parser.add_argument('--dsn', default=os.getenv('DATABASE_URL'), help='Postgres connection string')
+    parser.add_argument('--lookups', type=int, default=2000)
+    parser.add_argument('--rtt-ms', type=float, default=0, help='Simulated network round trip per query')
+    args = parser.parse_args()
+
+    if not args.dsn:
+        parser.error('pass --dsn or set DATABASE_URL')
+
+    try:
+        import psycopg2
+    except ImportError:
+        print("❌ psycopg2 is required: pip install psycopg2-binary")
+        return
+
+    conn = psycopg2.connect(args.dsn)
+    conn.autocommit = True
+    cursor = conn.cursor()
+    cursor.execute(EARNINGS_TABLE_DDL)
+    cursor.execute(load_function_sql())
+    cursor.execute("TRUNCATE earnings_lookup")
+
+    # Model rows for most pairs, make-only rows per make, a few narrower year bands
+    random.seed(7)
+    rows = []
+    for make in SAMPLE_MAKES:
+        rows.append((make, None, '2015+', random.randint(600, 1500)))
+        for model in random.sample(SAMPLE_MODELS, 6):
+            rows.append((make, model, '2018-2025', random.randint(600, 2000)))
+            rows.append((make, model, '2022-2025', random.randint(800, 2200)))
+    cursor.executemany(
+        "INSERT INTO earnings_lookup (make, model, year_range, estimated_monthly_earning) VALUES (%s, %s, %s, %s)",
+        rows
+    )
+    cursor.execute("ANALYZE earnings_lookup")
+
+    lookups = [(random.choice(SAMPLE_MAKES), random.choice(SAMPLE_MODELS), random.randint(2012, 2025))
+               for _ in range(args.lookups)]
+    rtt = args.rtt_ms / 1000
+    print(f"{len(rows)} earnings_lookup rows, {len(lookups)} lookups, simulated RTT {args.rtt_ms} ms\n")
+
+    for label, resolve in (('two-query chain', chain), ('resolve_earnings_estimate()', rpc)):
+        started = time.perf_counter()
+        found = sum(1 for lookup in lookups if resolve(cursor, *lookup, rtt) is not None)
+        elapsed = time.perf_counter() - started
+        print(f"{label:<30} {elapsed * 1000 / len(lookups):8.3f} ms/lookup   ({found} resolved)")
+
+    conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+"""Benchmark eligibility checks: the original per-call keyword scans vs. the compiled keyword matchers.
+
+    python bench_eligibility.py --checks 200000
+
+Times title and make/model checks per second for a repeating mix of
+inputs (decoded titles are one fixed string and fleets share make/model
+pairs) and for all-unique inputs. Nothing is memoized, so both mixes
+measure the matchers themselves. The original implementation is
+reproduced below as the baseline, and its answers are compared with the
+current checker's first.
+"""
+import argparse
+import random
+import time
+
+from eligibility_rules import TuroEligibilityChecker
+
+# --- Original implementation (before compiled matchers), kept as the baseline ---
+
+LEGACY_INELIGIBLE_MAKES = {
+    'LOTUS', 'MCLAREN', 'FERRARI', 'LAMBORGHINI', 'BUGATTI',
+    'KOENIGSEGG', 'PAGANI', 'MAYBACH', 'ROLLS-ROYCE', 'BENTLEY',
+    'ASTON MARTIN', 'MASERATI'
+}
+
+LEGACY_INELIGIBLE_MODELS = {
+    'DODGE': ['VIPER', 'CHALLENGER HELLCAT', 'CHARGER HELLCAT'],
+    'CHEVROLET': ['CORVETTE ZR1', 'CORVETTE Z06'],
+    'FORD': ['GT', 'SHELBY GT500'],
+    'NISSAN': ['GT-R'],
+    'HONDA': ['NSX'],
+    'ACURA': ['NSX'],
+    'BMW': ['I8', 'M8'],
+    'MERCEDES': ['AMG GT', 'SLS AMG'],
+    'AUDI': ['R8'],
+    'PORSCHE': ['911 TURBO', '918 SPYDER', 'CARRERA GT']
+}
+
+
+def legacy_check_make_model(make, model=None):
+    if not make:
+        return False, "Unable to determine vehicle make"
+    make_upper = make.upper()
+    if make_upper in LEGACY_INELIGIBLE_MAKES:
+        return False, f"{make} vehicles are not eligible for Turo"
+    if model and make_upper in LEGACY_INELIGIBLE_MODELS:
+        model_upper = model.upper()
+        for ineligible_model in LEGACY_INELIGIBLE_MODELS[make_upper]:
+            if ineligible_model in model_upper:
+                return False, f"{make} {model} is not eligible for Turo"
+    return True, f"{make} {model or ''} is eligible by make/model"
+
+
+def legacy_check_title(title_status):
+    if not title_status:
+        return False, "Title status verification required - cannot determine eligibility without valid title information"
+    title_status_upper = title_status.upper()
+    if 'UNKNOWN' in title_status_upper or 'VERIFICATION REQUIRED' in title_status_upper:
+        return False, "Title status must be verified before determining Turo eligibility. Please check your vehicle title document."
+    problematic_statuses = [
+        'SALVAGE', 'FLOOD', 'LEMON', 'REBUILT', 'JUNK', 'TOTAL LOSS',
+        'FIRE', 'HAIL', 'WATER', 'DAMAGED', 'RECONSTRUCTED', 'DISMANTLED',
+        'PARTS ONLY', 'NON-REPAIRABLE', 'CERTIFICATE OF DESTRUCTION',
+        'BRANDED', 'PRIOR SALVAGE', 'PRIOR FLOOD', 'MANUFACTURER BUYBACK'
+    ]
+    for status in problematic_statuses:
+        if status in title_status_upper:
+            return False, f"Vehicles with {title_status} titles are not eligible for Turo"
+    if 'CLEAN' in title_status_upper or 'CLEAR' in title_status_upper:
+        return True, f"Title status: {title_status} (eligible)"
+    return False, f"Title status '{title_status}' requires manual verification. Only vehicles with verified clean titles are eligible for Turo."
+
+# --- Inputs ---
+
+SAMPLE_TITLES = ['Clean', 'Clear', 'Salvage', 'Rebuilt', 'Unknown - Verification Required',
+                 'Prior Flood Damage', 'Lien']
+SAMPLE_VEHICLES = [('Honda', 'Accord'), ('Dodge', 'Viper'), ('Chevrolet', 'Corvette Z06'),
+                   ('Toyota', 'Camry'), ('Ferrari', '488'), ('BMW', 'X5')]
+
+
+def unique_titles(count):
+    words = ['Clean', 'Clear', 'Salvage', 'Lien', 'Duplicate', 'Original', 'Branded', 'Title']
+    return [f"{random.choice(words)} {random.choice(words)} #{i}" for i in range(count)]
+
+
+def unique_vehicles(count):
+    return [(make, f"{model} {i}") for i, (make, model) in
+            ((i, random.choice(SAMPLE_VEHICLES)) for i in range(count))]
+
+
+def rate(label, count, func):
+    started = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - started
+    per_second = count / elapsed if elapsed else float('inf')
+    print(f"{label:<44} {per_second / 1e6:6.2f}M checks/s")
+    return per_second
+
+
+def compare(label, count, legacy, current):
+    before = rate(f"{label} (before)", count, legacy)
+    after = rate(f"{label} (after)", count, current)
+    print(f"{'':<44} {after / before:6.2f}x\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark eligibility checks before/after compiled keyword matchers')
+    parser.add_argument('--checks', type=int, default=200000)
+    args = parser.parse_args()
+
+    random.seed(7)
+    checker = TuroEligibilityChecker()
+    rules = checker.rules
+
+    repeated_titles = [random.choice(SAMPLE_TITLES) for _ in range(args.checks)]
+    repeated_vehicles = [random.choice(SAMPLE_VEHICLES) for _ in range(args.checks)]
+    fresh_titles = unique_titles(args.checks)
+    fresh_vehicles = unique_vehicles(args.checks)
+
+    # Same answers (and reason strings) as the original on every input
+    for title in SAMPLE_TITLES + fresh_titles[:5000]:
+        assert checker.check_title_status_eligibility(title, rules) == legacy_check_title(title), title
+    for make, model in SAMPLE_VEHICLES + fresh_vehicles[:5000]:
+        assert checker.check_make_model_eligibility(make, model, rules) == legacy_check_make_model(make, model), (make, model)
+    print(f"Rules version {rules.version}: outputs identical to the original implementation\n")
+
+    print("Repeating inputs:")
+    compare('title checks', args.checks,
+            lambda: [legacy_check_title(title) for title in repeated_titles],
+            lambda: [checker.check_title_status_eligibility(title, rules) for title in repeated_titles])
+    compare('make/model checks', args.checks,
+            lambda: [legacy_check_make_model(make, model) for make, model in repeated_vehicles],
+            lambda: [checker.check_make_model_eligibility(make, model, rules) for make, model in repeated_vehicles])
+
+    print("All-unique inputs:")
+    compare('title checks', args.checks,
+            lambda: [legacy_check_title(title) for title in fresh_titles],
+            lambda: [checker.check_title_status_eligibility(title, rules) for title in fresh_titles])
+    compare('make/model checks', args.checks,
+            lambda: [legacy_check_make_model(make, model) for make, model in fresh_vehicles],
+            lambda: [checker.check_make_model_eligibility(make, model, rules) for make, model in fresh_vehicles])
+
+
+if __name__ == '__main__':
+    main()
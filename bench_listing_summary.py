@@ -0,0 +1,135 @@
+"""Benchmark marketplace page payloads against a local Postgres: select('*') on listings vs. the listing_summaries view.
+
+    python bench_listing_summary.py --dsn postgresql://localhost/turo_bench --rows 20000
+
+Creates a listings table plus the listing_summaries view from
+setup_database.sql in the target database, loads sample listings with
+realistic descriptions and image URLs, then times keyset pages of
+--page-size rows the way PostgREST serves them (json_agg of the query,
+parsed client-side) and reports the JSON payload per page.
+Requires psycopg2 (pip install psycopg2-binary).
+"""
+import argparse
+import json
+import os
+import random
+import re
+import time
+
+SETUP_SQL = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'setup_database.sql')
+
+LISTINGS_TABLE_DDL = """
+DROP VIEW IF EXISTS listing_summaries;
+DROP TABLE IF EXISTS listings;
+CREATE TABLE listings (
+  id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+  user_id UUID,
+  vin TEXT NOT NULL,
+  year INTEGER NOT NULL,
+  make TEXT NOT NULL,
+  model TEXT,
+  mileage INTEGER,
+  location TEXT NOT NULL,
+  description TEXT,
+  availability TEXT DEFAULT 'available_now',
+  estimated_earnings INTEGER DEFAULT 0,
+  images TEXT[] DEFAULT '{}',
+  is_active BOOLEAN DEFAULT TRUE,
+  created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+CREATE INDEX idx_listings_active_page ON listings(is_active, created_at DESC, id DESC);
+"""
+
+SAMPLE_VEHICLES = [('Honda', 'Accord'), ('Toyota', 'Camry'), ('Tesla', 'Model 3'), ('BMW', 'X5'), ('Ford', 'F-150')]
+SAMPLE_SENTENCES = [
+    'Well maintained with full service records.',
+    'Non-smoker vehicle, always garaged.',
+    'New tires and brakes installed last spring.',
+    'Great fuel economy and very popular with weekend renters.',
+    'Includes phone mount, USB-C chargers and all-weather floor mats.',
+    'Clean title, no accidents, detailed before every trip.'
+]
+
+FULL_QUERY = "SELECT * FROM listings WHERE is_active ORDER BY created_at DESC, id DESC LIMIT %s"
+SUMMARY_QUERY = "SELECT {} FROM listing_summaries WHERE is_active ORDER BY created_at DESC, id DESC LIMIT %s"
+
+
+def load_view_sql() -> str:
+    with open(SETUP_SQL) as f:
+        match = re.search(r"CREATE OR REPLACE VIEW listing_summaries.*?FROM listings;", f.read(), re.DOTALL)
+    if not match:
+        raise RuntimeError(f"listing_summaries not found in {SETUP_SQL}")
+    return match.group(0)
+
+
+def sample_listing():
+    make, model = random.choice(SAMPLE_VEHICLES)
+    listing_id = '%08x' % random.getrandbits(32)
+    return (
+        ''.join(random.choice('ABCDEFGHJKLMNPRSTUVWXYZ0123456789') for _ in range(17)),
+        random.randint(2015, 2025), make, model, random.randint(5000, 120000), 'San Francisco, CA',
+        ' '.join(random.choice(SAMPLE_SENTENCES) for _ in range(random.randint(8, 20))),
+        random.randint(600, 2500),
+        [f"https://example.supabase.co/storage/v1/object/public/listings/{listing_id}/{n}_{'%012x' % random.getrandbits(48)}.jpg"
+         for n in range(random.randint(3, 8))]
+    )
+
+
+def fetch_page(cursor, query, page_size):
+    # PostgREST builds the response body with json_agg in the database
+    cursor.execute(f"SELECT COALESCE(json_agg(t), '[]')::text FROM ({query}) t", (page_size,))
+    body = cursor.fetchone()[0]
+    return body, json.loads(body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark marketplace page payloads against Postgres')
+    parser.add_argument('--dsn', default=os.getenv('DATABASE_URL'), help='Postgres connection string')
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--page-size', type=int, default=50)
+    parser.add_argument('--pages', type=int, default=500, help='Pages fetched per variant')
+    args = parser.parse_args()
+
+    if not args.dsn:
+        parser.error('pass --dsn or set DATABASE_URL')
+
+    try:
+        import psycopg2
+    except ImportError:
+        print("❌ psycopg2 is required: pip install psycopg2-binary")
+        return
+
+    from supabase_client import LISTING_SUMMARY_COLUMNS
+
+    conn = psycopg2.connect(args.dsn)
+    conn.autocommit = True
+    cursor = conn.cursor()
+    cursor.execute(LISTINGS_TABLE_DDL)
+    cursor.execute(load_view_sql())
+
+    random.seed(7)
+    cursor.executemany(
+        "INSERT INTO listings (vin, year, make, model, mileage, location, description, estimated_earnings, images) "
+        "VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)",
+        [sample_listing() for _ in range(args.rows)]
+    )
+    cursor.execute("ANALYZE listings")
+    print(f"{args.rows} listings, {args.pages} pages of {args.page_size}\n")
+
+    variants = (
+        ("select('*') on listings", FULL_QUERY),
+        ('listing_summaries view', SUMMARY_QUERY.format(', '.join(LISTING_SUMMARY_COLUMNS)))
+    )
+    for label, query in variants:
+        fetch_page(cursor, query, args.page_size)  # warm up
+        started = time.perf_counter()
+        for _ in range(args.pages):
+            body, rows = fetch_page(cursor, query, args.page_size)
+        elapsed = time.perf_counter() - started
+        print(f"{label:<26} {len(body) / 1024:8.1f} KB/page   {elapsed * 1000 / args.pages:6.2f} ms/page")
+
+    conn.close()
+
+
+if __name__ == '__main__':
+    main()
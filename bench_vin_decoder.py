@@ -0,0 +1,89 @@
+"""Benchmark VINDecoder against the local vPIC stand-in server.
+
+    python bench_vin_decoder.py --latency-ms 50 --requests 200
+
+Measures per-request latency of fresh connections vs. the pooled session,
+cold vs. cached decodes, concurrent identical decodes (single-flight) and
+single vs. batch decoding of a fleet.
+"""
+import argparse
+import json
+import os
+import tempfile
+import threading
+import time
+
+import requests
+
+from vin_cache import VINCache
+from vin_utils import VINDecoder
+from vpic_stub_server import DEFAULT_FIXTURES, start_stub_server
+
+
+def timed(label: str, count: int, func):
+    started = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - started
+    print(f"{label:<44} {elapsed * 1000 / max(count, 1):8.2f} ms/op   ({count} ops, {elapsed:.2f}s)")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark VINDecoder against the vPIC stub')
+    parser.add_argument('--latency-ms', type=float, default=20)
+    parser.add_argument('--requests', type=int, default=100)
+    parser.add_argument('--threads', type=int, default=16)
+    args = parser.parse_args()
+
+    # Measure the decoder itself, not the outbound rate limit
+    os.environ['VPIC_RATE_LIMIT'] = '0'
+
+    server = start_stub_server(latency_ms=args.latency_ms)
+    base_url = f"http://127.0.0.1:{server.server_port}/api/vehicles"
+    with open(DEFAULT_FIXTURES) as f:
+        vins = list(json.load(f))
+    vin = vins[0]
+    print(f"Stub at {base_url}, {args.latency_ms} ms latency, {len(vins)} fixture VINs\n")
+
+    def unpooled():
+        for _ in range(args.requests):
+            requests.get(f"{base_url}/DecodeVinValues/{vin}?format=json", timeout=10).json()
+
+    pooled_decoder = VINDecoder(base_url=base_url)
+
+    def pooled():
+        for _ in range(args.requests):
+            pooled_decoder._fetch_vin(vin)
+
+    timed('fresh connection per request', args.requests, unpooled)
+    timed('pooled keep-alive session', args.requests, pooled)
+
+    cache_dir = tempfile.mkdtemp()
+    cached_decoder = VINDecoder(base_url=base_url, cache=VINCache(path=os.path.join(cache_dir, 'bench.sqlite3')))
+    timed('decode_vin, cold cache', len(vins), lambda: [cached_decoder.decode_vin(v) for v in vins])
+    timed('decode_vin, warm cache', args.requests, lambda: [cached_decoder.decode_vin(vin) for _ in range(args.requests)])
+
+    coalescing_decoder = VINDecoder(base_url=base_url)
+
+    def concurrent_identical():
+        threads = [threading.Thread(target=coalescing_decoder.decode_vin, args=(vin,)) for _ in range(args.threads)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    timed(f'{args.threads} concurrent decodes of one VIN', args.threads, concurrent_identical)
+    print(f"{'':<44} network calls: {coalescing_decoder.network_decodes}, "
+          f"collapsed: {coalescing_decoder.coalesced_decodes}")
+
+    # Distinct serials so batching is not flattered by de-duplication
+    fleet = [f"{vins[i % len(vins)][:11]}{i:06d}" for i in range(200)]
+    fleet_decoder = VINDecoder(base_url=base_url)
+    timed('fleet of 200, one decode_vin per VIN', len(fleet), lambda: [fleet_decoder._fetch_vin(v) for v in fleet])
+    timed('fleet of 200, decode_vins batch', len(fleet), lambda: fleet_decoder.decode_vins(fleet))
+
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
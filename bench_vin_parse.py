@@ -0,0 +1,143 @@
+"""Benchmark VIN response parsing: the original DecodeVin variable scan vs. the flat DecodeVinValues row.
+
+    python bench_vin_parse.py --iterations 20000
+
+Builds both response shapes for every VIN in the stand-in fixtures, padded
+to vPIC's ~140 variables (unused variables are empty, as vPIC returns
+them), then times parsing alone and JSON decoding plus parsing. The
+original DecodeVin parser is reproduced below as the baseline, and both
+parsers are checked to agree on make, model, year and body class first.
+"""
+import argparse
+import json
+import os
+import re
+import time
+
+from vin_utils import VINDecoder
+from vpic_stub_server import DEFAULT_FIXTURES
+
+# vPIC returns about this many variables per VIN in either shape
+VARIABLE_COUNT = 140
+
+# A sample of real vPIC variable names used as empty padding
+PADDING_VARIABLES = [
+    'Plant City', 'Plant Country', 'Plant State', 'Plant Company Name', 'Series', 'Series2',
+    'Trim2', 'Doors', 'Windows', 'Wheel Base (inches) From', 'Wheel Base Type', 'Track Width (inches)',
+    'Gross Vehicle Weight Rating To', 'Bed Length (inches)', 'Curb Weight (pounds)', 'Wheel Size Front (inches)',
+    'Wheel Size Rear (inches)', 'Top Speed (MPH)', 'Engine Number of Cylinders', 'Displacement (CC)',
+    'Displacement (CI)', 'Displacement (L)', 'Engine Stroke Cycles', 'Engine Model', 'Engine Power (kW)',
+    'Fuel Delivery / Fuel Injection Type', 'Engine Configuration', 'Turbo', 'Other Engine Info',
+    'Engine Manufacturer', 'Transmission Style', 'Transmission Speeds', 'Seat Belt Type', 'Other Restraint System Info',
+    'Front Air Bag Locations', 'Side Air Bag Locations', 'Curtain Air Bag Locations', 'Knee Air Bag Locations',
+    'Anti-lock Braking System (ABS)', 'Electronic Stability Control (ESC)', 'Traction Control',
+    'Tire Pressure Monitoring System (TPMS) Type', 'Keyless Ignition', 'Backup Camera', 'Parking Assist',
+    'Adaptive Cruise Control (ACC)', 'Forward Collision Warning (FCW)', 'Lane Departure Warning (LDW)',
+    'Lane Keeping Assistance (LKA)', 'Blind Spot Warning (BSW)', 'Daytime Running Light (DRL)',
+    'Headlamp Light Source', 'Semiautomatic Headlamp Beam Switching', 'Adaptive Driving Beam (ADB)',
+    'Note', 'Base Price ($)', 'Destination Market', 'Entertainment System', 'Steering Location',
+]
+
+
+def camel_to_variable(name: str) -> str:
+    """'ModelYear' -> 'Model Year', the DecodeVin spelling of a DecodeVinValues key"""
+    special = {'Manufacturer': 'Manufacturer Name', 'FuelTypePrimary': 'Fuel Type - Primary',
+               'GVWR': 'Gross Vehicle Weight Rating From', 'VIN': 'Suggested VIN'}
+    return special.get(name) or re.sub(r'(?<=[a-z])(?=[A-Z])', ' ', name)
+
+
+def build_bodies(row):
+    """Equivalent (DecodeVin, DecodeVinValues) JSON bodies for one fixture row"""
+    variables = {camel_to_variable(key): value for key, value in row.items()}
+    padding = PADDING_VARIABLES + [f"Other Variable {n}" for n in range(VARIABLE_COUNT)]
+    for name in padding[:max(VARIABLE_COUNT - len(variables), 0)]:
+        variables[name] = ''
+
+    decode_vin = {'Count': len(variables), 'Results': [
+        {'Value': value or None, 'ValueId': '', 'Variable': name, 'VariableId': index}
+        for index, (name, value) in enumerate(variables.items())
+    ]}
+    flat = dict(row)
+    for index in range(VARIABLE_COUNT - len(flat)):
+        flat[f"Padding{index}"] = ''
+    decode_vin_values = {'Count': 1, 'Results': [flat]}
+    return json.dumps(decode_vin), json.dumps(decode_vin_values)
+
+# --- Original implementation (DecodeVin response scan), kept as the baseline ---
+
+
+def legacy_parse_decode_vin(data):
+    if 'Results' not in data:
+        return None
+    vehicle_info = {'make': None, 'model': None, 'year': None, 'body_class': None,
+                    'title_status': 'Unknown - Verification Required'}
+    for result in data['Results']:
+        variable = result.get('Variable', '').lower()
+        value = result.get('Value')
+        if value and value != 'Not Applicable':
+            if 'make' in variable and not vehicle_info['make']:
+                vehicle_info['make'] = value
+            elif 'model' in variable and 'year' not in variable and not vehicle_info['model']:
+                vehicle_info['model'] = value
+            elif 'model year' in variable:
+                try:
+                    vehicle_info['year'] = int(value)
+                except (ValueError, TypeError):
+                    pass
+            elif 'body class' in variable:
+                vehicle_info['body_class'] = value
+    return vehicle_info if vehicle_info['make'] and vehicle_info['year'] else None
+
+
+def per_call(label, count, func):
+    started = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - started
+    print(f"{label:<44} {elapsed * 1e6 / count:8.2f} us/response")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark DecodeVin vs DecodeVinValues parsing')
+    parser.add_argument('--iterations', type=int, default=20000)
+    args = parser.parse_args()
+
+    with open(DEFAULT_FIXTURES) as f:
+        rows = list(json.load(f).values())
+    # Only the parser is used; skip the shared outbound rate limiter state file
+    os.environ['VPIC_RATE_LIMIT'] = '0'
+    decoder = VINDecoder()
+    bodies = [build_bodies(row) for row in rows]
+    parsed = [(json.loads(old), json.loads(new)) for old, new in bodies]
+
+    for old, new in parsed:
+        before = legacy_parse_decode_vin(old)
+        after = decoder._parse_values_row(new['Results'][0])
+        assert before and after, new['Results'][0].get('VIN')
+        for field in ('make', 'model', 'year', 'body_class'):
+            assert before[field] == after[field], (field, before[field], after[field])
+    print(f"{len(rows)} fixture VINs, {VARIABLE_COUNT} variables each; "
+          f"body sizes {sum(len(old) for old, _ in bodies) // len(bodies):,} vs "
+          f"{sum(len(new) for _, new in bodies) // len(bodies):,} bytes\n")
+
+    count = args.iterations
+    picks = [parsed[n % len(parsed)] for n in range(count)]
+    picked_bodies = [bodies[n % len(bodies)] for n in range(count)]
+
+    print("Parse only:")
+    before = per_call('DecodeVin variable scan (before)', count,
+                      lambda: [legacy_parse_decode_vin(old) for old, _ in picks])
+    after = per_call('DecodeVinValues flat row (after)', count,
+                     lambda: [decoder._parse_values_row(new['Results'][0]) for _, new in picks])
+    print(f"{'':<44} {before / after:8.1f}x faster\n")
+
+    print("JSON decode + parse:")
+    before = per_call('DecodeVin (before)', count,
+                      lambda: [legacy_parse_decode_vin(json.loads(old)) for old, _ in picked_bodies])
+    after = per_call('DecodeVinValues (after)', count,
+                     lambda: [decoder._parse_values_row(json.loads(new)['Results'][0]) for _, new in picked_bodies])
+    print(f"{'':<44} {before / after:8.1f}x faster")
+
+
+if __name__ == '__main__':
+    main()
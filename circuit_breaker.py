@@ -0,0 +1,121 @@
+import threading
+import time
+from typing import Dict, Optional
+
+
+class CircuitOpenError(Exception):
+    """Raised when a call is refused because the circuit is open"""
+    pass
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker for an external dependency.
+
+    Closed: calls flow normally. After failure_threshold consecutive failures
+    (a call slower than slow_call_seconds counts as one) the circuit opens and
+    calls fail fast for reset_timeout seconds. It then goes half-open and lets a
+    single trial call through; success closes it, failure re-opens it.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0,
+                 slow_call_seconds: Optional[float] = 5.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.slow_call_seconds = slow_call_seconds
+
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._consecutive_failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_in_progress = False
+
+        self.total_failures = 0
+        self.total_slow_calls = 0
+        self.rejected_calls = 0
+        self.times_opened = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self._state = self.HALF_OPEN
+            self._trial_in_progress = False
+        return self._state
+
+    def is_open(self) -> bool:
+        return self.state == self.OPEN
+
+    def reject_if_open(self) -> bool:
+        """True (and counts a rejection) while open; never claims the half-open trial"""
+        with self._lock:
+            if self._current_state() == self.OPEN:
+                self.rejected_calls += 1
+                return True
+            return False
+
+    def allow_request(self) -> bool:
+        """Return True if a call may proceed; counts a rejection otherwise"""
+        with self._lock:
+            state = self._current_state()
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._trial_in_progress:
+                self._trial_in_progress = True
+                return True
+            self.rejected_calls += 1
+            return False
+
+    def record_success(self, elapsed: Optional[float] = None):
+        """Record a completed call; a slow success still counts toward opening"""
+        if elapsed is not None and self.slow_call_seconds is not None and elapsed > self.slow_call_seconds:
+            with self._lock:
+                self.total_slow_calls += 1
+            self.record_failure(count_total=False)
+            return
+
+        with self._lock:
+            self._consecutive_failures = 0
+            self._trial_in_progress = False
+            self._state = self.CLOSED
+            self._opened_at = None
+
+    def record_failure(self, count_total: bool = True):
+        with self._lock:
+            if count_total:
+                self.total_failures += 1
+            self._consecutive_failures += 1
+            state = self._current_state()
+            if state == self.HALF_OPEN or self._consecutive_failures >= self.failure_threshold:
+                if state != self.OPEN:
+                    self.times_opened += 1
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._trial_in_progress = False
+
+    def get_state(self) -> Dict:
+        with self._lock:
+            state = self._current_state()
+            retry_in = None
+            if state == self.OPEN:
+                retry_in = round(max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at)), 2)
+            return {
+                'name': self.name,
+                'state': state,
+                'consecutive_failures': self._consecutive_failures,
+                'failure_threshold': self.failure_threshold,
+                'reset_timeout_seconds': self.reset_timeout,
+                'slow_call_seconds': self.slow_call_seconds,
+                'retry_in_seconds': retry_in,
+                'total_failures': self.total_failures,
+                'total_slow_calls': self.total_slow_calls,
+                'rejected_calls': self.rejected_calls,
+                'times_opened': self.times_opened
+            }
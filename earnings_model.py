@@ -0,0 +1,229 @@
+import time
+from datetime import datetime
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Specific vehicle model overrides based on actual Turo performance: (base, age_penalty)
+SPECIFIC_MODELS = {
+    # Tesla models - high demand electric vehicles
+    ('TESLA', 'MODEL_3'): (1800, 150),
+    ('TESLA', 'MODEL_Y'): (2200, 180),
+    ('TESLA', 'MODEL_S'): (2500, 200),
+    ('TESLA', 'MODEL_X'): (2800, 220),
+
+    # Luxury SUVs - high earning potential
+    ('BMW', 'X3'): (1600, 120),
+    ('BMW', 'X5'): (1900, 140),
+    ('MERCEDES', 'GLC'): (1700, 125),
+    ('MERCEDES', 'GLE'): (2000, 145),
+    ('AUDI', 'Q5'): (1500, 115),
+    ('AUDI', 'Q7'): (1800, 135),
+    ('LEXUS', 'RX'): (1400, 110),
+    ('LEXUS', 'GX'): (1700, 130),
+
+    # Popular economy models - reliable earners
+    ('HONDA', 'CIVIC'): (900, 60),
+    ('HONDA', 'ACCORD'): (1100, 70),
+    ('HONDA', 'CR-V'): (1200, 75),
+    ('HONDA', 'PILOT'): (1400, 85),
+    ('TOYOTA', 'CAMRY'): (1000, 65),
+    ('TOYOTA', 'COROLLA'): (850, 55),
+    ('TOYOTA', 'RAV4'): (1300, 80),
+    ('TOYOTA', 'HIGHLANDER'): (1500, 90),
+    ('TOYOTA', 'PRIUS'): (950, 60),
+
+    # Mid-range popular models
+    ('NISSAN', 'ALTIMA'): (950, 65),
+    ('NISSAN', 'ROGUE'): (1100, 70),
+    ('HYUNDAI', 'ELANTRA'): (850, 55),
+    ('HYUNDAI', 'TUCSON'): (1050, 70),
+    ('KIA', 'FORTE'): (800, 50),
+    ('KIA', 'SORENTO'): (1150, 75),
+
+    # American brands
+    ('FORD', 'F-150'): (1600, 100),
+    ('FORD', 'ESCAPE'): (1000, 70),
+    ('FORD', 'EXPLORER'): (1300, 85),
+    ('CHEVROLET', 'MALIBU'): (900, 60),
+    ('CHEVROLET', 'EQUINOX'): (1050, 70),
+    ('CHEVROLET', 'TAHOE'): (1800, 120),
+    ('JEEP', 'WRANGLER'): (1500, 90),
+    ('JEEP', 'GRAND_CHEROKEE'): (1350, 85),
+}
+
+# Brand-based fallback: (base, age_penalty)
+BRAND_DATA = {
+    # Ultra-luxury brands
+    'LAMBORGHINI': (4000, 300),
+    'FERRARI': (4500, 350),
+    'MCLAREN': (4200, 320),
+    'BENTLEY': (3500, 280),
+    'ROLLS-ROYCE': (4000, 300),
+    'MASERATI': (2800, 220),
+    'PORSCHE': (2600, 200),
+
+    # Premium luxury brands
+    'BMW': (1500, 110),
+    'MERCEDES': (1550, 115),
+    'MERCEDES-BENZ': (1550, 115),
+    'AUDI': (1400, 105),
+    'LEXUS': (1300, 95),
+    'CADILLAC': (1200, 90),
+    'LINCOLN': (1150, 85),
+    'ACURA': (1100, 80),
+    'INFINITI': (1050, 75),
+    'GENESIS': (1200, 85),
+
+    # Tesla - electric premium
+    'TESLA': (2000, 160),
+
+    # Reliable economy brands
+    'HONDA': (1000, 65),
+    'TOYOTA': (1050, 70),
+    'MAZDA': (950, 60),
+    'SUBARU': (1000, 65),
+
+    # Mid-tier brands
+    'NISSAN': (950, 65),
+    'HYUNDAI': (900, 60),
+    'KIA': (850, 55),
+    'VOLKSWAGEN': (1000, 70),
+    'VOLVO': (1100, 75),
+
+    # American brands
+    'FORD': (950, 70),
+    'CHEVROLET': (900, 65),
+    'GMC': (1000, 70),
+    'DODGE': (850, 60),
+    'CHRYSLER': (800, 55),
+    'JEEP': (1100, 75),
+    'RAM': (1200, 80),
+    'BUICK': (850, 60),
+
+    # Electric vehicle brands
+    'RIVIAN': (2200, 180),
+    'LUCID': (2800, 220),
+    'POLESTAR': (1600, 120),
+}
+
+# Unknown brand default
+DEFAULT_BRAND = (800, 60)
+
+SPECIFIC_FLOOR = 0.3
+BRAND_FLOOR = 0.25
+
+# Ages beyond this all share the last curve entry
+MAX_CURVE_AGE = 64
+
+
+def normalize_model(model: Optional[str]) -> str:
+    return (model or '').upper().replace(' ', '_').replace('-', '_')
+
+
+def brand_age_multiplier(age: int) -> float:
+    """Recent model year bonus / very old vehicle penalty applied to brand-based estimates"""
+    multiplier = 1.0
+    # Bonus for model years within 3 (x1.15) or 5 (x1.05) years of the current year
+    if age <= 3:
+        multiplier *= 1.15
+    elif age <= 5:
+        multiplier *= 1.05
+
+    if age > 15:
+        multiplier *= 0.7
+    elif age > 10:
+        multiplier *= 0.85
+    return multiplier
+
+
+class EarningsModel:
+    """Fallback earnings estimates compiled into flat arrays.
+
+    Every (make, model) resolves to one row of a rate table: specific models
+    first, then the brand, then the unknown-brand default. Each row holds base
+    earnings, age penalty, depreciation floor and which age-multiplier curve
+    applies, so estimate() is a dict hit plus arithmetic and estimate_many()
+    prices whole columns with NumPy.
+    """
+
+    def __init__(self, current_year: Optional[int] = None):
+        self._fixed_year = current_year
+        self._set_current_year(current_year or datetime.now().year)
+
+        rows = [(*DEFAULT_BRAND, BRAND_FLOOR, 1)]
+        self._brand_rows: Dict[str, int] = {}
+        for make, (base, penalty) in BRAND_DATA.items():
+            self._brand_rows[make] = len(rows)
+            rows.append((base, penalty, BRAND_FLOOR, 1))
+        self._specific_rows: Dict[Tuple[str, str], int] = {}
+        for (make, model), (base, penalty) in SPECIFIC_MODELS.items():
+            # Keys go through the same normalization as inputs, so 'CR-V' and 'F-150' match too
+            self._specific_rows[(make, normalize_model(model))] = len(rows)
+            rows.append((base, penalty, SPECIFIC_FLOOR, 0))
+
+        table = np.array(rows, dtype=np.float64)
+        self.base = table[:, 0]
+        self.age_penalty = table[:, 1]
+        self.floor = table[:, 0] * table[:, 2]
+        self.curve_id = table[:, 3].astype(np.intp)
+        self._rows = rows
+
+        # Curve 0 (specific models) is flat; curve 1 applies the brand bonus/penalty by age
+        ages = np.arange(MAX_CURVE_AGE + 1)
+        self.age_curves = np.vstack([
+            np.ones(len(ages)),
+            np.array([brand_age_multiplier(age) for age in ages])
+        ])
+        self._brand_curve = self.age_curves[1].tolist()
+        self._row_cache: Dict[Tuple[str, str], int] = {}
+
+    def _set_current_year(self, year: int):
+        self.current_year = year
+        self._year_ends_at = datetime(year + 1, 1, 1).timestamp()
+
+    def _current_year(self) -> int:
+        # Long-running workers roll over to the new model year on 1 January
+        if self._fixed_year is None and time.time() >= self._year_ends_at:
+            self._set_current_year(datetime.now().year)
+        return self.current_year
+
+    def row_for(self, make: Optional[str], model: Optional[str]) -> int:
+        """Rate table row for a make/model (memoized on the raw strings)"""
+        key = (make, model)
+        row = self._row_cache.get(key)
+        if row is None:
+            make_upper = (make or '').upper()
+            row = self._specific_rows.get((make_upper, normalize_model(model)))
+            if row is None:
+                row = self._brand_rows.get(make_upper, 0)
+            if len(self._row_cache) >= 65536:
+                self._row_cache.clear()
+            self._row_cache[key] = row
+        return row
+
+    def estimate(self, make: Optional[str], model: Optional[str], year: Optional[int]) -> int:
+        """Monthly earnings estimate for one vehicle"""
+        base, penalty, floor_ratio, curve = self._rows[self.row_for(make, model)]
+        age = self._current_year() - (year or 0)
+        earnings = max(base - age * penalty, base * floor_ratio)
+        if curve:
+            earnings *= self._brand_curve[min(max(age, 0), MAX_CURVE_AGE)]
+        return int(earnings)
+
+    def estimate_many(self, makes: Sequence[Optional[str]], models: Sequence[Optional[str]],
+                      years: Sequence[Optional[int]]) -> np.ndarray:
+        """Monthly earnings estimates for many vehicles at once (int64 array, input order)"""
+        rows = np.fromiter((self.row_for(make, model) for make, model in zip(makes, models)),
+                           dtype=np.intp, count=len(makes))
+        years = np.fromiter((year or 0 for year in years), dtype=np.int64, count=len(years))
+        ages = self._current_year() - years
+
+        base = self.base[rows]
+        earnings = np.maximum(base - ages * self.age_penalty[rows], self.floor[rows])
+        earnings *= self.age_curves[self.curve_id[rows], np.clip(ages, 0, MAX_CURVE_AGE)]
+        return earnings.astype(np.int64)
+
+
+# Shared instance for callers that just need the default tables
+DEFAULT_EARNINGS_MODEL = EarningsModel()
@@ -0,0 +1,194 @@
+import re
+import threading
+import time
+from bisect import bisect_right
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Open-ended bounds for ranges like '2018+' or a missing year_range
+MIN_YEAR = 0
+MAX_YEAR = 9999
+
+_YEAR_RANGE = re.compile(r'^\s*(\d{4})?\s*(?:(-|\+|to)\s*(\d{4})?)?\s*$', re.IGNORECASE)
+
+
+def parse_year_range(year_range: Optional[str]) -> Tuple[int, int]:
+    """'2018-2025' -> (2018, 2025); '2018+' / '2018-' -> (2018, MAX_YEAR); '2018' -> (2018, 2018); blank -> any year"""
+    if not year_range or not str(year_range).strip():
+        return MIN_YEAR, MAX_YEAR
+    match = _YEAR_RANGE.match(str(year_range))
+    if not match or not (match.group(1) or match.group(3)):
+        raise ValueError(f"Unrecognized year_range {year_range!r}")
+    start, separator, end = match.groups()
+    start = int(start) if start else MIN_YEAR
+    if separator:
+        end = int(end) if end else MAX_YEAR
+    else:
+        end = start
+    return min(start, end), max(start, end)
+
+
+class YearIntervalIndex:
+    """Non-overlapping year segments for one make/model key.
+
+    Overlapping ranges are flattened at build time so every segment holds the
+    estimate from the narrowest range covering it (first row, i.e. oldest, wins ties);
+    lookups are a single bisect.
+    """
+
+    def __init__(self, ranges: List[Tuple[int, int, int]]):
+        boundaries = sorted({start for start, _, _ in ranges} | {end + 1 for _, end, _ in ranges})
+        self.starts: List[int] = []
+        self.values: List[Optional[int]] = []
+        for segment_start in boundaries:
+            best = None
+            for order, (start, end, value) in enumerate(ranges):
+                if start <= segment_start <= end:
+                    candidate = (end - start, order, value)
+                    if best is None or candidate < best:
+                        best = candidate
+            value = best[2] if best else None
+            # Merge neighbours with the same answer
+            if self.values and self.values[-1] == value:
+                continue
+            self.starts.append(segment_start)
+            self.values.append(value)
+        # Year-less lookups take the narrowest range overall, like resolve_earnings_estimate()
+        self.any_year = min(((end - start, order, value) for order, (start, end, value) in enumerate(ranges)),
+                            default=(None, None, None))[2]
+
+    def get(self, year: Optional[int]) -> Optional[int]:
+        if not year:
+            return self.any_year
+        position = bisect_right(self.starts, year) - 1
+        return self.values[position] if position >= 0 else None
+
+
+class EarningsTable:
+    """In-memory copy of the earnings_lookup table.
+
+    The table holds a few dozen rows, so it is loaded whole. Rows are grouped
+    by (make, model) and (make, None) into year interval indexes, so a lookup
+    is two dict reads and a bisect at most. Staleness bound: once a copy is older than
+    refresh_interval the next lookup triggers a background reload (and is
+    answered from the current copy); once it is older than max_stale the
+    lookup reloads synchronously instead. So while the database is reachable
+    no answer is based on data older than max_stale, and under steady traffic
+    it is at most refresh_interval plus one query old. If a reload fails the
+    last good copy keeps being served and reloads are retried no more than
+    every retry_interval. refresh() reloads immediately (admin trigger, or
+    after a write from this process).
+    """
+
+    def __init__(self, fetch_rows: Callable[[], List[Dict]], refresh_interval: float = 300,
+                 max_stale: float = 900, retry_interval: float = 30):
+        self.fetch_rows = fetch_rows
+        self.refresh_interval = refresh_interval
+        self.max_stale = max(max_stale, refresh_interval)
+        self.retry_interval = retry_interval
+        self._retry_at = 0.0
+        self._exact: Dict[tuple, YearIntervalIndex] = {}
+        self._make_only: Dict[str, YearIntervalIndex] = {}
+        self.loaded_at: Optional[float] = None
+        self.row_count = 0
+        self._refresh_lock = threading.Lock()
+        self.refreshes = 0
+        self.refresh_failures = 0
+        self.lookups = 0
+
+    def refresh(self, seen_generation: Optional[int] = None) -> bool:
+        """Reload the table; on failure the previous copy stays in use.
+
+        Callers reacting to a stale copy pass the refreshes count they saw. If
+        another thread reloaded (or failed and set a retry time) while they
+        waited for the lock, they return without fetching the table again.
+        """
+        with self._refresh_lock:
+            if seen_generation is not None:
+                if self.refreshes != seen_generation:
+                    return True
+                if time.time() < self._retry_at:
+                    return False
+            try:
+                rows = self.fetch_rows()
+            except Exception as e:
+                self.refresh_failures += 1
+                self._retry_at = time.time() + self.retry_interval
+                print(f"Failed to refresh earnings lookup table: {e}")
+                return False
+
+            # Ties between equally specific rows go to the oldest, as in resolve_earnings_estimate()
+            rows = sorted(rows, key=lambda row: (row.get('created_at') is None, row.get('created_at') or '',
+                                                 str(row.get('id') or '')))
+            exact_ranges, make_ranges = {}, {}
+            for row in rows:
+                make = (row.get('make') or '').upper()
+                model = row.get('model')
+                try:
+                    start, end = parse_year_range(row.get('year_range'))
+                except ValueError as e:
+                    print(f"Treating earnings_lookup row for {make} {model or ''} as all years: {e}")
+                    start, end = MIN_YEAR, MAX_YEAR
+                ranges = exact_ranges.setdefault((make, model.upper()), []) if model else make_ranges.setdefault(make, [])
+                ranges.append((start, end, row['estimated_monthly_earning']))
+
+            exact = {key: YearIntervalIndex(ranges) for key, ranges in exact_ranges.items()}
+            make_only = {key: YearIntervalIndex(ranges) for key, ranges in make_ranges.items()}
+
+            # Swap whole dicts so readers never see a half-built table
+            self._exact, self._make_only = exact, make_only
+            self.row_count = len(rows)
+            self.loaded_at = time.time()
+            self.refreshes += 1
+            return True
+
+    def _refresh_in_background(self):
+        if self._refresh_lock.locked():
+            return
+        threading.Thread(target=self.refresh, args=(self.refreshes,), name='earnings-table-refresh',
+                         daemon=True).start()
+
+    def is_loaded(self) -> bool:
+        return self.loaded_at is not None
+
+    def ensure_loaded(self) -> bool:
+        """Retry a failed initial load (at most every retry_interval); True once a copy is in memory"""
+        if self.loaded_at is None and time.time() >= self._retry_at:
+            # If another thread is loading, this waits for its result instead of fetching again
+            self.refresh(self.refreshes)
+        return self.is_loaded()
+
+    def lookup(self, make: str, model: str, year: Optional[int] = None) -> Optional[int]:
+        """Most specific row covering the year: make/model, then make-only; None if neither matches"""
+        now = time.time()
+        generation = self.refreshes
+        age = now - self.loaded_at if self.loaded_at else None
+        if now >= self._retry_at:
+            if age is None or age > self.max_stale:
+                # Threads queued behind the first reload reuse its result
+                self.refresh(generation)
+            elif age > self.refresh_interval:
+                self._refresh_in_background()
+
+        self.lookups += 1
+        make_upper = (make or '').upper()
+        estimate = None
+        index = self._exact.get((make_upper, (model or '').upper()))
+        if index:
+            estimate = index.get(year)
+        if estimate is None:
+            index = self._make_only.get(make_upper)
+            if index:
+                estimate = index.get(year)
+        return estimate
+
+    def get_stats(self) -> Dict:
+        return {
+            'rows': self.row_count,
+            'loaded': self.is_loaded(),
+            'age_seconds': round(time.time() - self.loaded_at, 1) if self.loaded_at else None,
+            'refresh_interval_seconds': self.refresh_interval,
+            'max_stale_seconds': self.max_stale,
+            'refreshes': self.refreshes,
+            'refresh_failures': self.refresh_failures,
+            'lookups': self.lookups
+        }
@@ -1,98 +1,198 @@
+import ast
+import json
+import os
+import threading
+import time
 from datetime import datetime
-from typing import Dict, List, Tuple
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
 
-class TuroEligibilityChecker:
-    def __init__(self):
-        self.max_vehicle_age = 12
-        self.max_mileage = 130000
-        self.current_year = datetime.now().year
-        
-        # List of ineligible makes/models (commonly restricted on Turo)
-        self.ineligible_makes = {
-            'LOTUS', 'MCLAREN', 'FERRARI', 'LAMBORGHINI', 'BUGATTI', 
-            'KOENIGSEGG', 'PAGANI', 'MAYBACH', 'ROLLS-ROYCE', 'BENTLEY',
-            'ASTON MARTIN', 'MASERATI'
+DEFAULT_RULES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'eligibility_rules.json')
+
+def compile_keyword_matcher(keywords: Iterable[str]) -> Callable[[str], bool]:
+    """Compile a keyword set into one function: text -> any keyword is a substring of text.
+
+    The generated code is an unrolled `'K1' in text or 'K2' in text or ...`
+    chain, built once per rules version. CPython runs that faster than a loop
+    over the keywords or a regex alternation (sre tries every branch at every
+    position). Keywords containing another keyword of the set are dropped,
+    since the shorter one matches whenever the longer one would.
+    """
+    keywords = list(dict.fromkeys(keywords))
+    keywords = [keyword for keyword in keywords
+                if not any(other != keyword and other in keyword for other in keywords)]
+    if not keywords:
+        return lambda text: False
+    
+    text = ast.Name(id='text', ctx=ast.Load())
+    tests = [ast.Compare(left=ast.Constant(keyword), ops=[ast.In()], comparators=[text]) for keyword in keywords]
+    body = tests[0] if len(tests) == 1 else ast.BoolOp(op=ast.Or(), values=tests)
+    matcher = ast.Expression(ast.Lambda(
+        args=ast.arguments(posonlyargs=[], args=[ast.arg(arg='text')], kwonlyargs=[], kw_defaults=[], defaults=[]),
+        body=body
+    ))
+    # Keywords are AST constants, never source text, so a rules file cannot inject code
+    return eval(compile(ast.fix_missing_locations(matcher), '<keyword matcher>', 'eval'))
+
+def _ineligible_make(model_upper: str) -> bool:
+    """make_rules entry for makes that are ineligible whatever the model"""
+    return True
+
+class EligibilityRules:
+    """One immutable, precompiled version of the eligibility rules file"""
+    
+    def __init__(self, data: Dict):
+        self.version = str(data['version'])
+        self.max_vehicle_age = int(data['max_vehicle_age'])
+        self.max_mileage = int(data['max_mileage'])
+        self.ineligible_makes = frozenset(make.upper() for make in data.get('ineligible_makes', []))
+        self.ineligible_models = {
+            make.upper(): [model.upper() for model in models]
+            for make, models in data.get('ineligible_models', {}).items()
         }
+        self.problematic_title_statuses = [status.upper() for status in data.get('problematic_title_statuses', [])]
         
-        # Specific ineligible models (even if make is generally allowed)
-        self.ineligible_models = {
-            'DODGE': ['VIPER', 'CHALLENGER HELLCAT', 'CHARGER HELLCAT'],
-            'CHEVROLET': ['CORVETTE ZR1', 'CORVETTE Z06'],
-            'FORD': ['GT', 'SHELBY GT500'],
-            'NISSAN': ['GT-R'],
-            'HONDA': ['NSX'],
-            'ACURA': ['NSX'],
-            'BMW': ['I8', 'M8'],
-            'MERCEDES': ['AMG GT', 'SLS AMG'],
-            'AUDI': ['R8'],
-            'PORSCHE': ['911 TURBO', '918 SPYDER', 'CARRERA GT']
+        # Each keyword set is compiled once per version into a single matcher
+        self.is_unverified_title = compile_keyword_matcher(('UNKNOWN', 'VERIFICATION REQUIRED'))
+        self.is_problematic_title = compile_keyword_matcher(self.problematic_title_statuses)
+        self.is_clean_title = compile_keyword_matcher(('CLEAN', 'CLEAR'))
+        # One hashed lookup per make: ineligible makes reject every model, others test their model keywords
+        self.make_rules: Dict[str, Callable[[str], bool]] = {
+            make: compile_keyword_matcher(models) for make, models in self.ineligible_models.items()
         }
+        self.make_rules.update(dict.fromkeys(self.ineligible_makes, _ineligible_make))
+    
+    @classmethod
+    def load(cls, path: str) -> 'EligibilityRules':
+        with open(path) as f:
+            return cls(json.load(f))
+
+class TuroEligibilityChecker:
+    def __init__(self, rules_path: Optional[str] = None, reload_interval: Optional[float] = None):
+        self.current_year = datetime.now().year
+        
+        # Limits and make/model lists live in a versioned rules file that is hot-reloaded on change
+        if not rules_path:
+            # A relative ELIGIBILITY_RULES_PATH is relative to this module, not the working directory
+            rules_path = os.path.join(os.path.dirname(DEFAULT_RULES_PATH),
+                                      os.getenv('ELIGIBILITY_RULES_PATH') or DEFAULT_RULES_PATH)
+        self.rules_path = rules_path
+        self.reload_interval = reload_interval if reload_interval is not None else float(os.getenv('ELIGIBILITY_RULES_RELOAD_SECONDS', 5))
+        self._reload_lock = threading.Lock()
+        self._rules_mtime = None
+        self._next_reload_check = 0.0
+        try:
+            self._rules = self._load_rules()
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            if os.path.abspath(self.rules_path) == DEFAULT_RULES_PATH:
+                raise RuntimeError(f"Cannot load eligibility rules from {self.rules_path}: {e}") from e
+            # Boot on the bundled rules; the configured file is retried every reload_interval until it loads
+            print(f"❌ Cannot load eligibility rules from {self.rules_path} ({e}); "
+                  f"using the bundled {DEFAULT_RULES_PATH} until it is fixed")
+            self._rules = EligibilityRules.load(DEFAULT_RULES_PATH)
+    
+    def _load_rules(self) -> EligibilityRules:
+        mtime = os.stat(self.rules_path).st_mtime
+        rules = EligibilityRules.load(self.rules_path)
+        # Only remember the mtime once the file parsed, so a bad edit is retried every reload_interval
+        self._rules_mtime = mtime
+        print(f"Loaded eligibility rules version {rules.version} from {self.rules_path}")
+        return rules
+    
+    @property
+    def rules(self) -> EligibilityRules:
+        """Current rule set, swapped in atomically when the rules file changes"""
+        now = time.monotonic()
+        if now >= self._next_reload_check and self._reload_lock.acquire(blocking=False):
+            # Only one thread checks the file; everyone else keeps using the current rules meanwhile
+            try:
+                self._next_reload_check = now + self.reload_interval
+                if os.stat(self.rules_path).st_mtime != self._rules_mtime:
+                    self._rules = self._load_rules()
+            except Exception as e:
+                print(f"Failed to reload eligibility rules, keeping version {self._rules.version}: {e}")
+            finally:
+                self._reload_lock.release()
+        return self._rules
+    
+    @property
+    def rule_version(self) -> str:
+        return self.rules.version
+    
+    @property
+    def max_vehicle_age(self) -> int:
+        return self.rules.max_vehicle_age
     
-    def check_age_eligibility(self, model_year: int) -> Tuple[bool, str]:
+    @property
+    def max_mileage(self) -> int:
+        return self.rules.max_mileage
+    
+    @property
+    def ineligible_makes(self) -> frozenset:
+        return self.rules.ineligible_makes
+    
+    @property
+    def ineligible_models(self) -> Dict[str, List[str]]:
+        return self.rules.ineligible_models
+    
+    def check_age_eligibility(self, model_year: int, rules: Optional[EligibilityRules] = None) -> Tuple[bool, str]:
         """Check if vehicle meets age requirements"""
+        rules = rules or self.rules
         if not model_year:
             return False, "Unable to determine model year"
         
         vehicle_age = self.current_year - model_year
         
-        if vehicle_age > self.max_vehicle_age:
-            return False, f"Vehicle is {vehicle_age} years old (maximum allowed: {self.max_vehicle_age} years)"
+        if vehicle_age > rules.max_vehicle_age:
+            return False, f"Vehicle is {vehicle_age} years old (maximum allowed: {rules.max_vehicle_age} years)"
         
         return True, f"Vehicle age: {vehicle_age} years (within limit)"
     
-    def check_mileage_eligibility(self, mileage: int) -> Tuple[bool, str]:
+    def check_mileage_eligibility(self, mileage: int, rules: Optional[EligibilityRules] = None) -> Tuple[bool, str]:
         """Check if vehicle meets mileage requirements"""
-        if mileage > self.max_mileage:
-            return False, f"Mileage {mileage:,} exceeds maximum of {self.max_mileage:,} miles"
+        rules = rules or self.rules
+        if mileage > rules.max_mileage:
+            return False, f"Mileage {mileage:,} exceeds maximum of {rules.max_mileage:,} miles"
         
         return True, f"Mileage: {mileage:,} miles (within limit)"
     
-    def check_make_model_eligibility(self, make: str, model: str = None) -> Tuple[bool, str]:
+    def check_make_model_eligibility(self, make: str, model: str = None,
+                                     rules: Optional[EligibilityRules] = None) -> Tuple[bool, str]:
         """Check if make/model is eligible"""
         if not make:
             return False, "Unable to determine vehicle make"
         
-        make_upper = make.upper()
-        
-        # Check if make is completely ineligible
-        if make_upper in self.ineligible_makes:
-            return False, f"{make} vehicles are not eligible for Turo"
-        
-        # Check specific model restrictions
-        if model and make_upper in self.ineligible_models:
-            model_upper = model.upper()
-            for ineligible_model in self.ineligible_models[make_upper]:
-                if ineligible_model in model_upper:
-                    return False, f"{make} {model} is not eligible for Turo"
+        rules = rules or self.rules
+        make_rule = rules.make_rules.get(make.upper())
+        if make_rule is not None:
+            # Check if make is completely ineligible
+            if make_rule is _ineligible_make:
+                return False, f"{make} vehicles are not eligible for Turo"
+            
+            # Check specific model restrictions
+            if model and make_rule(model.upper()):
+                return False, f"{make} {model} is not eligible for Turo"
         
         return True, f"{make} {model or ''} is eligible by make/model"
     
-    def check_title_status_eligibility(self, title_status: str) -> Tuple[bool, str]:
+    def check_title_status_eligibility(self, title_status: str,
+                                       rules: Optional[EligibilityRules] = None) -> Tuple[bool, str]:
         """Check if vehicle title status is eligible for Turo"""
         if not title_status:
             return False, "Title status verification required - cannot determine eligibility without valid title information"
         
+        rules = rules or self.rules
         title_status_upper = title_status.upper()
         
         # Check for unknown/unverified status
-        if 'UNKNOWN' in title_status_upper or 'VERIFICATION REQUIRED' in title_status_upper:
+        if rules.is_unverified_title(title_status_upper):
             return False, "Title status must be verified before determining Turo eligibility. Please check your vehicle title document."
         
-        # List of problematic title statuses that make vehicles ineligible
-        problematic_statuses = [
-            'SALVAGE', 'FLOOD', 'LEMON', 'REBUILT', 'JUNK', 'TOTAL LOSS',
-            'FIRE', 'HAIL', 'WATER', 'DAMAGED', 'RECONSTRUCTED', 'DISMANTLED',
-            'PARTS ONLY', 'NON-REPAIRABLE', 'CERTIFICATE OF DESTRUCTION',
-            'BRANDED', 'PRIOR SALVAGE', 'PRIOR FLOOD', 'MANUFACTURER BUYBACK'
-        ]
-        
         # Check if title contains any problematic keywords
-        for status in problematic_statuses:
-            if status in title_status_upper:
-                return False, f"Vehicles with {title_status} titles are not eligible for Turo"
+        if rules.is_problematic_title(title_status_upper):
+            return False, f"Vehicles with {title_status} titles are not eligible for Turo"
         
         # Only accept explicitly clean titles
-        if 'CLEAN' in title_status_upper or 'CLEAR' in title_status_upper:
+        if rules.is_clean_title(title_status_upper):
             return True, f"Title status: {title_status} (eligible)"
         
         # If title status is not explicitly clean or contains unknown terms
@@ -105,11 +205,14 @@ class TuroEligibilityChecker:
         year = vehicle_info.get('year')
         title_status = vehicle_info.get('title_status', 'Clean')
         
+        # One rules snapshot for all checks, so a reload mid-check cannot mix versions
+        rules = self.rules
+        
         # Individual checks
-        age_eligible, age_reason = self.check_age_eligibility(year)
-        mileage_eligible, mileage_reason = self.check_mileage_eligibility(mileage)
-        make_model_eligible, make_model_reason = self.check_make_model_eligibility(make, model)
-        title_eligible, title_reason = self.check_title_status_eligibility(title_status)
+        age_eligible, age_reason = self.check_age_eligibility(year, rules)
+        mileage_eligible, mileage_reason = self.check_mileage_eligibility(mileage, rules)
+        make_model_eligible, make_model_reason = self.check_make_model_eligibility(make, model, rules)
+        title_eligible, title_reason = self.check_title_status_eligibility(title_status, rules)
         
         # Overall eligibility - ALL checks must pass
         overall_eligible = age_eligible and mileage_eligible and make_model_eligible and title_eligible
@@ -131,10 +234,34 @@ class TuroEligibilityChecker:
         return {
             'eligible': overall_eligible,
             'reasons': reasons,
+            'rule_version': rules.version,
             'details': {
                 'age_check': {'passed': age_eligible, 'reason': age_reason},
                 'mileage_check': {'passed': mileage_eligible, 'reason': mileage_reason},
                 'make_model_check': {'passed': make_model_eligible, 'reason': make_model_reason},
                 'title_check': {'passed': title_eligible, 'reason': title_reason}
             }
-        }
\ No newline at end of file
+        }
+    
+    def build_age_rejection(self, model_year: int, mileage: int) -> Dict:
+        """Eligibility result for a vehicle rejected on model year (no VIN decode needed; mileage is still checked)"""
+        rules = self.rules
+        age_eligible, age_reason = self.check_age_eligibility(model_year, rules)
+        mileage_eligible, mileage_reason = self.check_mileage_eligibility(mileage, rules)
+        skipped_reason = "Not checked - vehicle does not meet the age requirement"
+        
+        reasons = [age_reason]
+        if not mileage_eligible:
+            reasons.append(mileage_reason)
+        
+        return {
+            'eligible': False,
+            'reasons': reasons,
+            'rule_version': rules.version,
+            'details': {
+                'age_check': {'passed': age_eligible, 'reason': age_reason},
+                'mileage_check': {'passed': mileage_eligible, 'reason': mileage_reason},
+                'make_model_check': {'passed': False, 'reason': skipped_reason},
+                'title_check': {'passed': False, 'reason': skipped_reason}
+            }
+        }
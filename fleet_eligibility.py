@@ -0,0 +1,109 @@
+import numpy as np
+from typing import Dict, Iterable, List, Optional, Sequence
+from eligibility_rules import TuroEligibilityChecker
+
+
+class FleetEligibilityChecker:
+    """Vectorized eligibility screening for fleet and auction imports.
+
+    Vehicles are passed as columns: integer arrays for year and mileage, plus
+    integer codes into make/model/title vocabularies. Age and mileage are plain
+    array comparisons; make/model and title rules run once per distinct value
+    through TuroEligibilityChecker and are broadcast back by code, so the reason
+    strings match check_full_eligibility exactly when a row is explained.
+    """
+
+    def __init__(self, checker: Optional[TuroEligibilityChecker] = None):
+        self.checker = checker or TuroEligibilityChecker()
+
+    @staticmethod
+    def encode(vehicles: Iterable[Dict]) -> Dict:
+        """Build columnar input from vehicle dicts (keys: year, mileage, make, model, title_status)"""
+        vocabularies = {'make': {}, 'model': {}, 'title_status': {}}
+        # Missing keys get the same defaults as check_full_eligibility (a missing title counts as 'Clean')
+        defaults = {'make': '', 'model': '', 'title_status': 'Clean'}
+        years, mileages = [], []
+        codes = {field: [] for field in vocabularies}
+
+        for vehicle in vehicles:
+            years.append(vehicle.get('year') or 0)
+            mileages.append(vehicle.get('mileage') or 0)
+            for field, vocabulary in vocabularies.items():
+                value = vehicle.get(field, defaults[field])
+                codes[field].append(vocabulary.setdefault(value, len(vocabulary)))
+
+        return {
+            'years': np.asarray(years, dtype=np.int32),
+            'mileages': np.asarray(mileages, dtype=np.int64),
+            'make_codes': np.asarray(codes['make'], dtype=np.int32),
+            'model_codes': np.asarray(codes['model'], dtype=np.int32),
+            'title_codes': np.asarray(codes['title_status'], dtype=np.int32),
+            'makes': list(vocabularies['make']),
+            'models': list(vocabularies['model']),
+            'titles': list(vocabularies['title_status'])
+        }
+
+    def check(self, years, mileages, make_codes, model_codes, title_codes,
+              makes: Sequence[Optional[str]], models: Sequence[Optional[str]],
+              titles: Sequence[Optional[str]], explain: Iterable[int] = ()) -> Dict:
+        """Run all four checks over whole columns.
+
+        Returns per-check boolean arrays plus 'eligible'; 'explanations' maps each
+        row index in `explain` to a check_full_eligibility-style result.
+        """
+        checker = self.checker
+        # Whole batch is screened against one rules version
+        rules = checker.rules
+        years = np.asarray(years, dtype=np.int32)
+        mileages = np.asarray(mileages, dtype=np.int64)
+        make_codes = np.asarray(make_codes, dtype=np.int64)
+        model_codes = np.asarray(model_codes, dtype=np.int64)
+        title_codes = np.asarray(title_codes, dtype=np.int64)
+
+        # A year of 0 means "unknown", which check_age_eligibility also rejects
+        age_ok = (years > 0) & (checker.current_year - years <= rules.max_vehicle_age)
+        mileage_ok = mileages <= rules.max_mileage
+
+        # Evaluate each distinct make/model pair once, then scatter back to rows
+        pair_keys = make_codes * max(len(models), 1) + model_codes
+        unique_pairs, pair_index = np.unique(pair_keys, return_inverse=True)
+        pair_ok = np.fromiter(
+            (checker.check_make_model_eligibility(makes[key // max(len(models), 1)],
+                                                  models[key % max(len(models), 1)], rules)[0]
+             for key in unique_pairs),
+            dtype=bool, count=len(unique_pairs)
+        )
+        make_model_ok = pair_ok[pair_index]
+
+        title_table = np.fromiter(
+            (checker.check_title_status_eligibility(title, rules)[0] for title in titles),
+            dtype=bool, count=len(titles)
+        )
+        title_ok = title_table[title_codes] if len(titles) else np.zeros(len(years), dtype=bool)
+
+        eligible = age_ok & mileage_ok & make_model_ok & title_ok
+
+        explanations = {}
+        for row in explain:
+            vehicle_info = {
+                'make': makes[make_codes[row]],
+                'model': models[model_codes[row]],
+                'year': int(years[row]) or None,
+                'title_status': titles[title_codes[row]]
+            }
+            explanations[int(row)] = checker.check_full_eligibility(vehicle_info, int(mileages[row]))
+
+        return {
+            'eligible': eligible,
+            'age_ok': age_ok,
+            'mileage_ok': mileage_ok,
+            'make_model_ok': make_model_ok,
+            'title_ok': title_ok,
+            'eligible_count': int(eligible.sum()),
+            'rule_version': rules.version,
+            'explanations': explanations
+        }
+
+    def check_vehicles(self, vehicles: List[Dict], explain: Iterable[int] = ()) -> Dict:
+        """Convenience wrapper: encode vehicle dicts, then check them"""
+        return self.check(**self.encode(vehicles), explain=explain)
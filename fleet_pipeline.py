@@ -0,0 +1,143 @@
+import csv
+import io
+import json
+from itertools import islice
+from typing import Callable, Dict, Iterable, Iterator, Optional, TextIO
+
+from eligibility_rules import TuroEligibilityChecker
+from vin_utils import VINDecoder
+
+# Rows decoded per decode_vins call; bounds memory and in-flight NHTSA batches
+FLEET_CHUNK_SIZE = 500
+
+# Earnings lookups remembered per (make, model, year) while a file is processed
+EARNINGS_MEMO_SIZE = 10000
+
+RESULT_COLUMNS = [
+    'row', 'vin', 'mileage', 'year', 'make', 'model', 'eligible',
+    'reasons', 'earnings_estimate', 'rule_version', 'error'
+]
+
+
+def read_fleet_csv(stream: TextIO) -> Iterator[Dict]:
+    """Lazily parse {'row', 'vin', 'mileage', 'error'} per CSV line without loading the file"""
+    reader = csv.DictReader(stream)
+    # Accept "VIN", "vin", "Mileage", "odometer" ... in any column order
+    header = {name.strip().lower(): name for name in reader.fieldnames or []}
+    vin_column = header.get('vin')
+    mileage_column = header.get('mileage') or header.get('odometer')
+    if not vin_column or not mileage_column:
+        # Raised here, before any output is streamed, so the caller can still return a 400
+        raise ValueError("CSV must have 'vin' and 'mileage' columns")
+    return _parse_fleet_rows(reader, vin_column, mileage_column)
+
+
+def _parse_fleet_rows(reader: csv.DictReader, vin_column: str, mileage_column: str) -> Iterator[Dict]:
+    row_number = 0
+    while True:
+        try:
+            row = next(reader)
+        except StopIteration:
+            return
+        except (UnicodeDecodeError, csv.Error) as e:
+            # The response is already streaming by now, so the failure becomes a final error row
+            yield {'row': row_number + 1, 'vin': '', 'mileage': None, 'error': f"Could not read CSV: {e}"}
+            return
+        row_number += 1
+        vin = (row.get(vin_column) or '').strip().upper()
+        mileage_str = (row.get(mileage_column) or '').strip().replace(',', '')
+        try:
+            mileage = int(mileage_str)
+            if mileage < 0:
+                raise ValueError("Negative mileage")
+            error = None
+        except ValueError:
+            mileage = None
+            error = 'Invalid mileage'
+        yield {'row': row_number, 'vin': vin, 'mileage': mileage, 'error': error}
+
+
+class FleetPipeline:
+    """Streams fleet rows through batch decoding, eligibility and earnings.
+
+    Rows are pulled one chunk at a time, so memory stays flat however long the
+    upload is; within a chunk VINs go through VINDecoder.decode_vins (cache,
+    local vPIC, then bounded-concurrency NHTSA batch calls).
+    """
+
+    def __init__(self, vin_decoder: VINDecoder, eligibility_checker: TuroEligibilityChecker,
+                 earnings_lookup: Optional[Callable[[str, str, int], Optional[int]]] = None,
+                 chunk_size: int = FLEET_CHUNK_SIZE):
+        self.vin_decoder = vin_decoder
+        self.eligibility_checker = eligibility_checker
+        self.earnings_lookup = earnings_lookup
+        self.chunk_size = chunk_size
+        self._earnings: Dict[tuple, Optional[int]] = {}
+
+    def _estimate_earnings(self, vehicle_info: Dict) -> Optional[int]:
+        if not self.earnings_lookup:
+            return None
+        key = (vehicle_info.get('make', ''), vehicle_info.get('model', ''), vehicle_info.get('year', 0))
+        if key not in self._earnings:
+            if len(self._earnings) >= EARNINGS_MEMO_SIZE:
+                self._earnings.clear()
+            self._earnings[key] = self.earnings_lookup(*key)
+        return self._earnings[key]
+
+    def _check_chunk(self, rows) -> Iterator[Dict]:
+        decodable = [row for row in rows if not row['error']]
+        decoded = self.vin_decoder.decode_vins([row['vin'] for row in decodable])
+        decoded_by_row = {row['row']: result for row, result in zip(decodable, decoded)}
+
+        for row in rows:
+            result = {column: None for column in RESULT_COLUMNS}
+            result.update(row=row['row'], vin=row['vin'], mileage=row['mileage'], error=row['error'])
+
+            decode = decoded_by_row.get(row['row'])
+            if decode and not decode['vehicle_info']:
+                result['error'] = decode['error'] or 'Unable to decode VIN'
+            if result['error']:
+                yield result
+                continue
+
+            vehicle_info = decode['vehicle_info']
+            eligibility = self.eligibility_checker.check_full_eligibility(vehicle_info, row['mileage'])
+            result.update(
+                year=vehicle_info.get('year'),
+                make=vehicle_info.get('make'),
+                model=vehicle_info.get('model'),
+                eligible=eligibility['eligible'],
+                reasons=eligibility['reasons'],
+                rule_version=eligibility['rule_version']
+            )
+            if eligibility['eligible']:
+                result['earnings_estimate'] = self._estimate_earnings(vehicle_info)
+            yield result
+
+    def run(self, rows: Iterable[Dict]) -> Iterator[Dict]:
+        """Yield one result dict per input row, in input order"""
+        rows = iter(rows)
+        while True:
+            chunk = list(islice(rows, self.chunk_size))
+            if not chunk:
+                return
+            yield from self._check_chunk(chunk)
+
+
+def format_ndjson(results: Iterable[Dict]) -> Iterator[str]:
+    for result in results:
+        yield json.dumps(result) + '\n'
+
+
+def format_csv(results: Iterable[Dict]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=RESULT_COLUMNS)
+    writer.writeheader()
+    yield buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+    for result in results:
+        writer.writerow({**result, 'reasons': '; '.join(result['reasons'] or [])})
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
@@ -0,0 +1,104 @@
+import os
+import struct
+import threading
+import time
+from typing import Dict
+
+try:
+    import fcntl
+except ImportError:  # Windows: no flock, limiter only covers this process
+    fcntl = None
+
+_STATE = struct.Struct('dd')  # tokens, last refill timestamp
+
+
+class SharedTokenBucket:
+    """Token bucket whose state lives in a small file guarded by flock.
+
+    Every gunicorn worker on the host opens the same state file, so they all
+    draw from one budget of `rate` requests per second with bursts up to
+    `capacity`. Callers over the limit wait (up to a deadline) for a token
+    instead of bursting into upstream throttling.
+    """
+
+    def __init__(self, path: str, rate: float, capacity: float):
+        self.path = path
+        self.rate = rate
+        self.capacity = capacity
+        # flock does not exclude threads sharing one descriptor, so also lock in-process
+        self._thread_lock = threading.Lock()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+
+        if fcntl is None:
+            print("fcntl unavailable - outbound rate limit applies per process only")
+
+        self.acquired = 0
+        self.waited = 0
+        self.timed_out = 0
+
+    def _lock(self):
+        if fcntl:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+
+    def _unlock(self):
+        if fcntl:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def _try_take(self) -> float:
+        """Take a token if one is available; return 0, or seconds until the next token"""
+        with self._thread_lock:
+            self._lock()
+            try:
+                os.lseek(self._fd, 0, os.SEEK_SET)
+                raw = os.read(self._fd, _STATE.size)
+                now = time.time()
+                if len(raw) == _STATE.size:
+                    tokens, last = _STATE.unpack(raw)
+                else:
+                    tokens, last = self.capacity, now
+
+                tokens = min(self.capacity, tokens + max(0.0, now - last) * self.rate)
+                wait = 0.0 if tokens >= 1 else (1 - tokens) / self.rate
+                if tokens >= 1:
+                    tokens -= 1
+
+                os.lseek(self._fd, 0, os.SEEK_SET)
+                os.write(self._fd, _STATE.pack(tokens, now))
+                return wait
+            finally:
+                self._unlock()
+
+    def acquire(self, timeout: float) -> bool:
+        """Wait up to `timeout` seconds for a token; False if the deadline passes first"""
+        deadline = time.monotonic() + timeout
+        waited = False
+
+        while True:
+            wait = self._try_take()
+            if wait == 0:
+                self.acquired += 1
+                if waited:
+                    self.waited += 1
+                return True
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self.timed_out += 1
+                return False
+
+            waited = True
+            # Small jitter so queued workers do not all wake on the same tick
+            time.sleep(min(remaining, wait + 0.005 * (os.getpid() % 7)))
+
+    def get_stats(self) -> Dict:
+        return {
+            'rate_per_second': self.rate,
+            'burst': self.capacity,
+            'shared_across_processes': fcntl is not None,
+            'acquired': self.acquired,
+            'waited': self.waited,
+            'timed_out': self.timed_out
+        }
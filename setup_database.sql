@@ -70,6 +70,38 @@ CREATE INDEX IF NOT EXISTS idx_contact_requests_seller ON contact_requests(selle
 CREATE INDEX IF NOT EXISTS idx_contact_requests_listing ON contact_requests(listing_id);
 CREATE INDEX IF NOT EXISTS idx_vin_checks_date ON vin_checks(checked_at);
 
+-- Keyset pagination: each page is a range scan on (filter column, created_at DESC, id DESC)
+CREATE INDEX IF NOT EXISTS idx_listings_active_page ON listings(is_active, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_listings_user_page ON listings(user_id, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_contact_requests_seller_page ON contact_requests(seller_id, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_contact_requests_buyer_page ON contact_requests(buyer_id, created_at DESC, id DESC);
+-- Full-table keyset scans for batch_check.py re-screens
+CREATE INDEX IF NOT EXISTS idx_vin_checks_page ON vin_checks(checked_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_listings_page ON listings(created_at DESC, id DESC);
+
+-- Marketplace cards: only what a card renders (no vin, full description or images array).
+-- security_invoker keeps the listings RLS policies in force; the view is inlined, so the
+-- listings indexes above serve keyset pages on it.
+CREATE OR REPLACE VIEW listing_summaries WITH (security_invoker = true) AS
+SELECT
+  id,
+  year,
+  make,
+  model,
+  mileage,
+  location,
+  availability,
+  estimated_earnings,
+  is_active,
+  created_at,
+  left(description, 100) AS description_preview,
+  COALESCE(char_length(description) > 100, false) AS description_truncated,
+  images[1] AS thumbnail,
+  COALESCE(cardinality(images), 0) AS image_count
+FROM listings;
+
+GRANT SELECT ON listing_summaries TO anon, authenticated;
+
 -- Insert sample earnings data
 INSERT INTO earnings_lookup (make, model, year_range, estimated_monthly_earning) VALUES
 ('HONDA', 'ACCORD', '2018-2025', 800),
@@ -84,6 +116,41 @@ INSERT INTO earnings_lookup (make, model, year_range, estimated_monthly_earning)
 ('CHEVROLET', 'MALIBU', '2018-2025', 700)
 ON CONFLICT DO NOTHING;
 
+CREATE INDEX IF NOT EXISTS idx_earnings_lookup_make_model ON earnings_lookup(make, model);
+
+-- Best earnings estimate in one round trip: make/model rows before make-only rows,
+-- then the narrowest year_range covering p_year ('2018-2025', '2018+', '2018', blank = all years)
+CREATE OR REPLACE FUNCTION resolve_earnings_estimate(p_make TEXT, p_model TEXT, p_year INTEGER DEFAULT NULL)
+RETURNS INTEGER
+LANGUAGE plpgsql
+STABLE
+AS $$
+DECLARE
+  estimate INTEGER;
+BEGIN
+  SELECT e.estimated_monthly_earning INTO estimate
+  FROM earnings_lookup e
+  CROSS JOIN LATERAL (
+    SELECT
+      COALESCE(substring(e.year_range FROM '^\s*(\d{4})')::INTEGER, 0) AS year_from,
+      CASE
+        WHEN e.year_range IS NULL OR btrim(e.year_range) = '' THEN 9999
+        WHEN e.year_range ~ '^\s*\d{4}\s*$' THEN btrim(e.year_range)::INTEGER
+        ELSE COALESCE(substring(e.year_range FROM '(?:-|\+|[Tt][Oo])\s*(\d{4})\s*$')::INTEGER, 9999)
+      END AS year_to
+  ) r
+  WHERE e.make = upper(p_make)
+    AND (e.model = upper(p_model) OR e.model IS NULL)
+    AND (p_year IS NULL OR p_year BETWEEN r.year_from AND r.year_to)
+  ORDER BY e.model IS NULL, r.year_to - r.year_from, e.created_at, e.id
+  LIMIT 1;
+  
+  RETURN estimate;
+END;
+$$;
+
+GRANT EXECUTE ON FUNCTION resolve_earnings_estimate(TEXT, TEXT, INTEGER) TO anon, authenticated;
+
 -- Enable Row Level Security (RLS) for data protection
 ALTER TABLE users ENABLE ROW LEVEL SECURITY;
 ALTER TABLE listings ENABLE ROW LEVEL SECURITY;
@@ -1,11 +1,158 @@
 import os
+import base64
+import json
+import httpx
+from postgrest import SyncPostgrestClient
+from postgrest.exceptions import APIError
+from postgrest.utils import SyncClient
 from supabase import create_client, Client
-from typing import Dict, Optional, List
+from typing import Dict, Iterator, Optional, List
 from datetime import datetime
+import threading
 import uuid
+from earnings_model import DEFAULT_EARNINGS_MODEL
+from earnings_table import EarningsTable
+from vin_check_writer import VINCheckWriter
+
+# Columns of the listings table; anything else cached alongside a listing is not sent
+LISTING_COLUMNS = (
+    'id', 'user_id', 'vin', 'year', 'make', 'model', 'mileage', 'location', 'description',
+    'availability', 'estimated_earnings', 'images', 'is_active', 'created_at'
+)
+
+
+class Page(list):
+    """One page of rows; next_cursor is None on the last page"""
+
+    def __init__(self, rows=(), next_cursor: Optional[str] = None):
+        super().__init__(rows)
+        self.next_cursor = next_cursor
+
+
+def encode_cursor(row: Dict, time_column: str = 'created_at') -> str:
+    """Opaque keyset cursor for the (time_column, id) position of a row"""
+    payload = json.dumps([row[time_column], str(row['id'])], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[tuple]:
+    """(created_at, id) from a cursor; None if missing or malformed.
+
+    Both values end up in a PostgREST filter string, so created_at must parse
+    as an ISO timestamp and id as a UUID before the cursor is used.
+    """
+    if not cursor:
+        return None
+    try:
+        payload = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        created_at, row_id = json.loads(payload)
+        datetime.fromisoformat(created_at.replace('Z', '+00:00'))
+        return created_at, str(uuid.UUID(row_id))
+    except (ValueError, TypeError, AttributeError):
+        return None
+
+
+def keyset_page(query, limit: Optional[int], cursor: Optional[str] = None,
+                time_column: str = 'created_at') -> Page:
+    """Run query newest first, continuing after cursor.
+
+    Ordering on (created_at, id) and seeking past the cursor instead of OFFSET
+    means every page is an index range scan, however deep. The redundant
+    created_at <= bound is what Postgres uses as the index condition; the OR
+    alone would be a filter over every newer row. One extra row is fetched to
+    tell whether another page exists. limit=None fetches everything.
+    time_column names the timestamp column for tables without created_at.
+    """
+    position = decode_cursor(cursor)
+    if position:
+        created_at, row_id = position
+        query = query.lte(time_column, created_at).or_(
+            f'{time_column}.lt."{created_at}",and({time_column}.eq."{created_at}",id.lt."{row_id}")'
+        )
+    query = query.order(time_column, desc=True).order('id', desc=True)
+    if limit is not None:
+        query = query.limit(limit + 1)
+
+    rows = query.execute().data or []
+    if limit is not None and len(rows) > limit:
+        rows = rows[:limit]
+        return Page(rows, encode_cursor(rows[-1], time_column))
+    return Page(rows)
+
+
+# Marketplace cards show a preview of the description and the first image only
+LISTING_PREVIEW_LENGTH = 100
+
+# Columns of the listing_summaries view (setup_database.sql) used to render marketplace cards
+LISTING_SUMMARY_COLUMNS = (
+    'id', 'year', 'make', 'model', 'mileage', 'location', 'availability', 'estimated_earnings',
+    'is_active', 'created_at', 'description_preview', 'description_truncated', 'thumbnail', 'image_count'
+)
+
+# listings columns a summary is derived from when the view is not available
+LISTING_CARD_SOURCE_COLUMNS = (
+    'id', 'year', 'make', 'model', 'mileage', 'location', 'availability', 'estimated_earnings',
+    'is_active', 'created_at', 'description', 'images'
+)
+
+
+def summarize_listing(listing: Dict) -> Dict:
+    """Reduce a full listing row to the listing_summaries shape"""
+    description = listing.get('description') or ''
+    images = listing.get('images') or []
+    summary = {column: listing.get(column) for column in LISTING_SUMMARY_COLUMNS}
+    summary.update({
+        'description_preview': description[:LISTING_PREVIEW_LENGTH],
+        'description_truncated': len(description) > LISTING_PREVIEW_LENGTH,
+        'thumbnail': images[0] if images else None,
+        'image_count': len(images)
+    })
+    return summary
+
+
+class PooledPostgrestClient(SyncPostgrestClient):
+    """PostgREST client whose keep-alive pool is sized by SUPABASE_POOL_SIZE / SUPABASE_KEEPALIVE_SECONDS"""
+    
+    def create_session(self, base_url: str, headers: Dict[str, str], timeout, verify: bool = True,
+                       proxy: Optional[str] = None) -> SyncClient:
+        pool_size = int(os.getenv('SUPABASE_POOL_SIZE', 20))
+        limits = httpx.Limits(
+            max_connections=pool_size,
+            max_keepalive_connections=pool_size,
+            keepalive_expiry=float(os.getenv('SUPABASE_KEEPALIVE_SECONDS', 60))
+        )
+        return SyncClient(
+            base_url=base_url,
+            headers=headers,
+            timeout=timeout,
+            verify=verify,
+            proxy=proxy,
+            limits=limits,
+            follow_redirects=True,
+            http2=True,
+        )
+
+
+def init_pooled_postgrest_client(rest_url: str, headers: Dict[str, str], schema: str, timeout,
+                                 verify: bool = True) -> PooledPostgrestClient:
+    """Drop-in for supabase-py's Client._init_postgrest_client"""
+    return PooledPostgrestClient(rest_url, headers=headers, schema=schema, timeout=timeout, verify=verify)
+
 
 class SupabaseLogger:
+    # Construction counters, so /health can show that requests and webhooks reuse one client
+    loggers_created = 0
+    clients_created = 0
+    _counter_lock = threading.Lock()
+    
+    # earnings_lookup is tiny and read on every eligible check, so one in-memory copy serves the whole process
+    _earnings_table: Optional[EarningsTable] = None
+    _earnings_table_lock = threading.Lock()
+    
     def __init__(self):
+        with SupabaseLogger._counter_lock:
+            SupabaseLogger.loggers_created += 1
+        
         # Get Supabase credentials from environment variables
         self.supabase_url = os.getenv('SUPABASE_URL')
         self.supabase_key = os.getenv('SUPABASE_ANON_KEY')
@@ -35,6 +182,10 @@ class SupabaseLogger:
                 print(f"🔗 Connecting to: {self.supabase_url}")
                 # Use the most compatible client initialization method
                 self.client = create_client(self.supabase_url, self.supabase_key)
+                # supabase-py builds its PostgREST client lazily (and again after auth events); route it through the pooled session
+                self.client._init_postgrest_client = init_pooled_postgrest_client
+                with SupabaseLogger._counter_lock:
+                    SupabaseLogger.clients_created += 1
                 print("✅ Supabase client initialized successfully")
             except Exception as e:
                 print(f"❌ Failed to initialize Supabase client: {e}")
@@ -44,11 +195,29 @@ class SupabaseLogger:
         else:
             print("⚠️ Supabase credentials not found in environment variables")
             print("📱 Running in fallback mode without database")
+        
+        self.earnings_table = self._get_earnings_table() if self.client else None
+        # Started on the first logged check, so short-lived loggers (e.g. webhooks) never spawn a writer thread
+        self.vin_check_writer: Optional[VINCheckWriter] = None
+        self._writer_lock = threading.Lock()
     
     def is_connected(self) -> bool:
         """Check if Supabase client is properly initialized"""
         return self.client is not None
     
+    def _vin_check_row(self, vin: str, mileage: int, vehicle_info: Dict,
+                       eligibility_result: Dict) -> Dict:
+        return {
+            'vin': vin.upper(),
+            'mileage': mileage,
+            'make': vehicle_info.get('make'),
+            'model': vehicle_info.get('model'),
+            'year': vehicle_info.get('year'),
+            'eligible': eligibility_result.get('eligible', False),
+            'reason': '; '.join(eligibility_result.get('reasons', [])),
+            'checked_at': datetime.now().isoformat()
+        }
+    
     def log_vin_check(self, vin: str, mileage: int, vehicle_info: Dict, 
                      eligibility_result: Dict) -> bool:
         """Log VIN check to Supabase database"""
@@ -57,16 +226,12 @@ class SupabaseLogger:
             return False
         
         try:
-            data = {
-                'vin': vin.upper(),
-                'mileage': mileage,
-                'make': vehicle_info.get('make'),
-                'model': vehicle_info.get('model'),
-                'year': vehicle_info.get('year'),
-                'eligible': eligibility_result.get('eligible', False),
-                'reason': '; '.join(eligibility_result.get('reasons', [])),
-                'checked_at': datetime.now().isoformat()
-            }
+            data = self._vin_check_row(vin, mileage, vehicle_info, eligibility_result)
+            
+            writer = self._get_vin_check_writer()
+            if writer:
+                # Analytics only: queue for a batched background insert instead of blocking the response
+                return writer.submit(data)
             
             response = self.client.table('vin_checks').insert(data).execute()
             return True
@@ -75,6 +240,67 @@ class SupabaseLogger:
             print(f"Failed to log to Supabase: {e}")
             return False
     
+    def _get_vin_check_writer(self) -> Optional[VINCheckWriter]:
+        if os.getenv('VIN_CHECK_WRITE_BEHIND', '1') == '0':
+            return None
+        if self.vin_check_writer is None:
+            with self._writer_lock:
+                if self.vin_check_writer is None:
+                    self.vin_check_writer = VINCheckWriter(
+                        self._insert_vin_check_rows,
+                        max_queue=int(os.getenv('VIN_CHECK_QUEUE_SIZE', 10000)),
+                        batch_size=int(os.getenv('VIN_CHECK_BATCH_SIZE', 200)),
+                        flush_interval=float(os.getenv('VIN_CHECK_FLUSH_SECONDS', 2)),
+                        spill_dir=os.getenv('VIN_CHECK_SPILL_DIR', 'instance')
+                    )
+        return self.vin_check_writer
+    
+    def _insert_vin_check_rows(self, rows: List[Dict]):
+        """Multi-row insert into vin_checks; raises on failure so the writer can spill"""
+        self.client.table('vin_checks').insert(rows).execute()
+    
+    def log_vin_checks(self, checks: List[Dict], chunk_size: int = 500) -> int:
+        """Log many VIN checks with multi-row inserts; each check has vin, mileage, vehicle_info, eligibility_result"""
+        if not self.client:
+            print("Supabase client not initialized - skipping database log")
+            return 0
+        
+        logged = 0
+        rows = [self._vin_check_row(c['vin'], c['mileage'], c['vehicle_info'], c['eligibility_result']) for c in checks]
+        for start in range(0, len(rows), chunk_size):
+            chunk = rows[start:start + chunk_size]
+            try:
+                self.client.table('vin_checks').insert(chunk).execute()
+                logged += len(chunk)
+            except Exception as e:
+                print(f"Failed to log {len(chunk)} VIN checks to Supabase: {e}")
+        return logged
+    
+    def iter_vehicles(self, table: str, page_size: int = 1000) -> Iterator[Dict]:
+        """Yield {'vin', 'mileage'} rows from vin_checks or listings, one page at a time.
+        
+        Keyset pages run newest first, so rows inserted while iterating (e.g.
+        batch_check --write-db logging into vin_checks) sort ahead of the cursor
+        and cannot shift later pages the way OFFSET paging did.
+        """
+        if not self.client:
+            return
+        
+        time_column = 'checked_at' if table == 'vin_checks' else 'created_at'
+        cursor = None
+        while True:
+            try:
+                query = self.client.table(table).select(f'id, {time_column}, vin, mileage')
+                page = keyset_page(query, page_size, cursor, time_column)
+            except Exception as e:
+                print(f"Failed to read {table} after cursor {cursor}: {e}")
+                return
+            
+            yield from page
+            if not page.next_cursor:
+                return
+            cursor = page.next_cursor
+    
     def get_recent_checks(self, limit: int = 50) -> list:
         """Get recent VIN checks from database"""
         if not self.client:
@@ -202,46 +428,133 @@ class SupabaseLogger:
             # For testing, return the listing ID even when database fails
             return listing_data.get('id', str(uuid.uuid4()))
     
-    def get_active_listings(self, limit: int = 50) -> List[Dict]:
-        """Get all active marketplace listings"""
+    def upsert_listings(self, listings: List[Dict]) -> int:
+        """Insert or update listings keyed on id; returns rows written.
+        
+        One multi-row request per distinct set of keys. PostgREST sends the
+        union of all keys as the column list, so a row missing a key would be
+        written as NULL and, on conflict, wipe the stored value. created_at and
+        is_active are left to the column defaults, so re-sending a listing never
+        resets them.
+        """
+        if not self.client:
+            return 0
+        
+        groups: Dict[tuple, List[Dict]] = {}
+        for listing in listings:
+            row = {column: listing[column] for column in LISTING_COLUMNS if column in listing}
+            row.setdefault('id', str(uuid.uuid4()))
+            groups.setdefault(tuple(sorted(row)), []).append(row)
+        
+        written = 0
+        for rows in groups.values():
+            # Re-sending a listing overwrites it instead of creating a duplicate
+            response = self.client.table('listings').upsert(rows, on_conflict='id').execute()
+            written += len(response.data) if response.data else len(rows)
+        return written
+    
+    def upsert_listings_isolating_failures(self, listings: List[Dict]) -> Dict[str, str]:
+        """Upsert listings, bisecting a rejected batch down to the offending rows.
+
+        Returns {listing id: error} for rows the database rejected (constraint
+        violations and the like); everything else was written. Connection errors
+        are raised, since splitting the batch cannot help with those.
+        """
+        try:
+            self.upsert_listings(listings)
+            return {}
+        except APIError as e:
+            if len(listings) == 1:
+                return {listings[0].get('id'): getattr(e, 'message', None) or str(e)}
+        
+        middle = len(listings) // 2
+        failed = self.upsert_listings_isolating_failures(listings[:middle])
+        failed.update(self.upsert_listings_isolating_failures(listings[middle:]))
+        return failed
+    
+    def get_active_listings(self, limit: int = 50, cursor: str = None) -> Page:
+        """Get one page of active marketplace listings, newest first"""
         if not self.client:
             print("No database connection - returning sample listings")
-            return self._get_sample_listings()
+            return Page(self._get_sample_listings())
         
         try:
-            response = self.client.table('listings')\
+            query = self.client.table('listings')\
                 .select('*')\
-                .eq('is_active', True)\
-                .order('created_at', desc=True)\
-                .limit(limit)\
-                .execute()
+                .eq('is_active', True)
             
-            return response.data if response.data else []
+            return keyset_page(query, limit, cursor)
             
         except Exception as e:
             print(f"Failed to fetch listings from database: {e}")
             print("Using sample listings for demo")
-            return self._get_sample_listings()
+            return Page(self._get_sample_listings())
     
-    def get_user_listings(self, user_id: str) -> List[Dict]:
-        """Get all listings for a specific user"""
+    def get_listing_summaries(self, limit: int = 50, cursor: str = None) -> Page:
+        """Get one page of marketplace cards (listing_summaries view), newest first"""
         if not self.client:
-            print("No database connection - returning sample user listings")
-            return self._get_sample_user_listings(user_id)
+            print("No database connection - returning sample listings")
+            return Page(summarize_listing(listing) for listing in self._get_sample_listings())
+        
+        try:
+            query = self.client.table('listing_summaries')\
+                .select(','.join(LISTING_SUMMARY_COLUMNS))\
+                .eq('is_active', True)
+            
+            return keyset_page(query, limit, cursor)
+            
+        except Exception as e:
+            print(f"listing_summaries view query failed, summarizing listings rows instead: {e}")
+        
+        try:
+            # Still skips vin, user_id and the rest; description and images are trimmed here
+            query = self.client.table('listings')\
+                .select(','.join(LISTING_CARD_SOURCE_COLUMNS))\
+                .eq('is_active', True)
+            
+            page = keyset_page(query, limit, cursor)
+            return Page((summarize_listing(listing) for listing in page), page.next_cursor)
+            
+        except Exception as e:
+            print(f"Failed to fetch listing summaries from database: {e}")
+            print("Using sample listings for demo")
+            return Page(summarize_listing(listing) for listing in self._get_sample_listings())
+    
+    def get_listing(self, listing_id: str) -> Optional[Dict]:
+        """Get one full listing row by id (contact flow)"""
+        if not self.client:
+            return next((listing for listing in self._get_sample_listings() if listing['id'] == listing_id), None)
         
         try:
             response = self.client.table('listings')\
                 .select('*')\
-                .eq('user_id', user_id)\
-                .order('created_at', desc=True)\
+                .eq('id', listing_id)\
+                .limit(1)\
                 .execute()
             
-            return response.data if response.data else []
+            return response.data[0] if response.data else None
+            
+        except Exception as e:
+            print(f"Failed to fetch listing {listing_id} from database: {e}")
+            return None
+    
+    def get_user_listings(self, user_id: str, limit: int = None, cursor: str = None) -> Page:
+        """Get listings for a specific user, newest first (all of them unless limit is set)"""
+        if not self.client:
+            print("No database connection - returning sample user listings")
+            return Page(self._get_sample_user_listings(user_id))
+        
+        try:
+            query = self.client.table('listings')\
+                .select('*')\
+                .eq('user_id', user_id)
+            
+            return keyset_page(query, limit, cursor)
             
         except Exception as e:
             print(f"Failed to fetch user listings from database: {e}")
             print("Using sample user listings for demo")
-            return self._get_sample_user_listings(user_id)
+            return Page(self._get_sample_user_listings(user_id))
     
     def _get_sample_listings(self) -> List[Dict]:
         """Return sample listings for demo purposes"""
@@ -308,12 +621,71 @@ class SupabaseLogger:
             return False
     
     # Earnings lookup methods
-    def get_earnings_estimate(self, make: str, model: str, year: int) -> Optional[int]:
+    def _get_earnings_table(self) -> EarningsTable:
+        """Process-wide earnings table, loaded once by the first connected logger"""
+        with SupabaseLogger._earnings_table_lock:
+            if SupabaseLogger._earnings_table is None:
+                table = EarningsTable(
+                    self._fetch_earnings_rows,
+                    refresh_interval=float(os.getenv('EARNINGS_REFRESH_SECONDS', 300)),
+                    max_stale=float(os.getenv('EARNINGS_MAX_STALE_SECONDS', 900))
+                )
+                if table.refresh():
+                    print(f"✅ Loaded {table.row_count} earnings_lookup rows into memory")
+                SupabaseLogger._earnings_table = table
+            return SupabaseLogger._earnings_table
+    
+    def _fetch_earnings_rows(self) -> List[Dict]:
+        response = self.client.table('earnings_lookup')\
+            .select('id, make, model, year_range, estimated_monthly_earning, created_at')\
+            .order('created_at')\
+            .order('id')\
+            .execute()
+        return response.data or []
+    
+    def refresh_earnings_table(self) -> bool:
+        """Reload the in-memory earnings table now (admin function)"""
+        if not self.earnings_table:
+            return False
+        return self.earnings_table.refresh()
+    
+    def get_earnings_estimate(self, make: str, model: str, year: int, use_cache: bool = True) -> Optional[int]:
         """Get earnings estimate for a vehicle"""
         if not self.client:
             # Fallback to hardcoded estimates if no database
             return self._get_fallback_earnings(make, model, year)
         
+        # A table whose first load failed keeps retrying here; the RPC is only used while it is unavailable
+        if use_cache and self.earnings_table.ensure_loaded():
+            # Make/model, then make-only, for the row whose year_range covers this year (in memory, no round trip)
+            estimate = self.earnings_table.lookup(make, model, year)
+        else:
+            estimate = self._query_earnings_estimate(make, model, year)
+        
+        if estimate is not None:
+            return estimate
+        
+        # Fallback to hardcoded estimates
+        return self._get_fallback_earnings(make, model, year)
+    
+    def _query_earnings_estimate(self, make: str, model: str, year: int) -> Optional[int]:
+        """Resolve an estimate from the database, bypassing the in-memory table"""
+        try:
+            # One round trip: resolve_earnings_estimate() in setup_database.sql does the whole fallback chain
+            response = self.client.rpc('resolve_earnings_estimate', {
+                'p_make': make or '',
+                'p_model': model or '',
+                'p_year': year or None
+            }).execute()
+            data = response.data
+            if isinstance(data, list):
+                data = data[0] if data else None
+            if isinstance(data, dict):
+                data = next(iter(data.values()), None)
+            return data
+        except Exception as e:
+            print(f"resolve_earnings_estimate RPC failed, falling back to table queries: {e}")
+        
         try:
             # Try exact match first
             response = self.client.table('earnings_lookup')\
@@ -335,162 +707,16 @@ class SupabaseLogger:
             if response.data:
                 return response.data[0]['estimated_monthly_earning']
             
-            # Fallback to hardcoded estimates
-            return self._get_fallback_earnings(make, model, year)
+            return None
             
         except Exception as e:
             print(f"Failed to get earnings estimate: {e}")
-            return self._get_fallback_earnings(make, model, year)
+            return None
     
     def _get_fallback_earnings(self, make: str, model: str, year: int) -> int:
         """Accurate earnings estimates based on real Turo market data"""
-        make_upper = make.upper()
-        model_upper = model.upper()
-        current_year = 2025
-        age = current_year - year
-        
-        # Specific vehicle model overrides based on actual Turo performance
-        specific_models = {
-            # Tesla models - high demand electric vehicles
-            ('TESLA', 'MODEL_3'): {'base': 1800, 'age_penalty': 150},
-            ('TESLA', 'MODEL_Y'): {'base': 2200, 'age_penalty': 180},
-            ('TESLA', 'MODEL_S'): {'base': 2500, 'age_penalty': 200},
-            ('TESLA', 'MODEL_X'): {'base': 2800, 'age_penalty': 220},
-            
-            # Luxury SUVs - high earning potential
-            ('BMW', 'X3'): {'base': 1600, 'age_penalty': 120},
-            ('BMW', 'X5'): {'base': 1900, 'age_penalty': 140},
-            ('MERCEDES', 'GLC'): {'base': 1700, 'age_penalty': 125},
-            ('MERCEDES', 'GLE'): {'base': 2000, 'age_penalty': 145},
-            ('AUDI', 'Q5'): {'base': 1500, 'age_penalty': 115},
-            ('AUDI', 'Q7'): {'base': 1800, 'age_penalty': 135},
-            ('LEXUS', 'RX'): {'base': 1400, 'age_penalty': 110},
-            ('LEXUS', 'GX'): {'base': 1700, 'age_penalty': 130},
-            
-            # Popular economy models - reliable earners
-            ('HONDA', 'CIVIC'): {'base': 900, 'age_penalty': 60},
-            ('HONDA', 'ACCORD'): {'base': 1100, 'age_penalty': 70},
-            ('HONDA', 'CR-V'): {'base': 1200, 'age_penalty': 75},
-            ('HONDA', 'PILOT'): {'base': 1400, 'age_penalty': 85},
-            ('TOYOTA', 'CAMRY'): {'base': 1000, 'age_penalty': 65},
-            ('TOYOTA', 'COROLLA'): {'base': 850, 'age_penalty': 55},
-            ('TOYOTA', 'RAV4'): {'base': 1300, 'age_penalty': 80},
-            ('TOYOTA', 'HIGHLANDER'): {'base': 1500, 'age_penalty': 90},
-            ('TOYOTA', 'PRIUS'): {'base': 950, 'age_penalty': 60},
-            
-            # Mid-range popular models
-            ('NISSAN', 'ALTIMA'): {'base': 950, 'age_penalty': 65},
-            ('NISSAN', 'ROGUE'): {'base': 1100, 'age_penalty': 70},
-            ('HYUNDAI', 'ELANTRA'): {'base': 850, 'age_penalty': 55},
-            ('HYUNDAI', 'TUCSON'): {'base': 1050, 'age_penalty': 70},
-            ('KIA', 'FORTE'): {'base': 800, 'age_penalty': 50},
-            ('KIA', 'SORENTO'): {'base': 1150, 'age_penalty': 75},
-            
-            # American brands
-            ('FORD', 'F-150'): {'base': 1600, 'age_penalty': 100},
-            ('FORD', 'ESCAPE'): {'base': 1000, 'age_penalty': 70},
-            ('FORD', 'EXPLORER'): {'base': 1300, 'age_penalty': 85},
-            ('CHEVROLET', 'MALIBU'): {'base': 900, 'age_penalty': 60},
-            ('CHEVROLET', 'EQUINOX'): {'base': 1050, 'age_penalty': 70},
-            ('CHEVROLET', 'TAHOE'): {'base': 1800, 'age_penalty': 120},
-            ('JEEP', 'WRANGLER'): {'base': 1500, 'age_penalty': 90},
-            ('JEEP', 'GRAND_CHEROKEE'): {'base': 1350, 'age_penalty': 85},
-        }
-        
-        # Check for specific model match
-        model_key = model_upper.replace(' ', '_').replace('-', '_')
-        if (make_upper, model_key) in specific_models:
-            data = specific_models[(make_upper, model_key)]
-            base_earnings = data['base']
-            age_penalty = data['age_penalty']
-            
-            # Apply age depreciation
-            depreciated_earnings = max(base_earnings - (age * age_penalty), base_earnings * 0.3)
-            return int(depreciated_earnings)
-        
-        # Brand-based fallback with more accurate data
-        brand_data = {
-            # Ultra-luxury brands
-            'LAMBORGHINI': {'base': 4000, 'age_penalty': 300},
-            'FERRARI': {'base': 4500, 'age_penalty': 350},
-            'MCLAREN': {'base': 4200, 'age_penalty': 320},
-            'BENTLEY': {'base': 3500, 'age_penalty': 280},
-            'ROLLS-ROYCE': {'base': 4000, 'age_penalty': 300},
-            'MASERATI': {'base': 2800, 'age_penalty': 220},
-            'PORSCHE': {'base': 2600, 'age_penalty': 200},
-            
-            # Premium luxury brands
-            'BMW': {'base': 1500, 'age_penalty': 110},
-            'MERCEDES': {'base': 1550, 'age_penalty': 115},
-            'MERCEDES-BENZ': {'base': 1550, 'age_penalty': 115},
-            'AUDI': {'base': 1400, 'age_penalty': 105},
-            'LEXUS': {'base': 1300, 'age_penalty': 95},
-            'CADILLAC': {'base': 1200, 'age_penalty': 90},
-            'LINCOLN': {'base': 1150, 'age_penalty': 85},
-            'ACURA': {'base': 1100, 'age_penalty': 80},
-            'INFINITI': {'base': 1050, 'age_penalty': 75},
-            'GENESIS': {'base': 1200, 'age_penalty': 85},
-            
-            # Tesla - electric premium
-            'TESLA': {'base': 2000, 'age_penalty': 160},
-            
-            # Reliable economy brands
-            'HONDA': {'base': 1000, 'age_penalty': 65},
-            'TOYOTA': {'base': 1050, 'age_penalty': 70},
-            'MAZDA': {'base': 950, 'age_penalty': 60},
-            'SUBARU': {'base': 1000, 'age_penalty': 65},
-            
-            # Mid-tier brands
-            'NISSAN': {'base': 950, 'age_penalty': 65},
-            'HYUNDAI': {'base': 900, 'age_penalty': 60},
-            'KIA': {'base': 850, 'age_penalty': 55},
-            'VOLKSWAGEN': {'base': 1000, 'age_penalty': 70},
-            'VOLVO': {'base': 1100, 'age_penalty': 75},
-            
-            # American brands
-            'FORD': {'base': 950, 'age_penalty': 70},
-            'CHEVROLET': {'base': 900, 'age_penalty': 65},
-            'GMC': {'base': 1000, 'age_penalty': 70},
-            'DODGE': {'base': 850, 'age_penalty': 60},
-            'CHRYSLER': {'base': 800, 'age_penalty': 55},
-            'JEEP': {'base': 1100, 'age_penalty': 75},
-            'RAM': {'base': 1200, 'age_penalty': 80},
-            'BUICK': {'base': 850, 'age_penalty': 60},
-            
-            # Electric vehicle brands
-            'RIVIAN': {'base': 2200, 'age_penalty': 180},
-            'LUCID': {'base': 2800, 'age_penalty': 220},
-            'POLESTAR': {'base': 1600, 'age_penalty': 120},
-        }
-        
-        # Apply brand-based calculation
-        if make_upper in brand_data:
-            data = brand_data[make_upper]
-            base_earnings = data['base']
-            age_penalty = data['age_penalty']
-        else:
-            # Unknown brand default
-            base_earnings = 800
-            age_penalty = 60
-        
-        # Apply age depreciation with minimum floor
-        depreciated_earnings = max(base_earnings - (age * age_penalty), base_earnings * 0.25)
-        
-        # Apply additional factors
-        
-        # Recent model year bonus
-        if year >= 2022:
-            depreciated_earnings *= 1.15
-        elif year >= 2020:
-            depreciated_earnings *= 1.05
-        
-        # Very old vehicle penalty
-        if age > 15:
-            depreciated_earnings *= 0.7
-        elif age > 10:
-            depreciated_earnings *= 0.85
-        
-        return int(depreciated_earnings)
+        # Rate tables are compiled once in earnings_model; the current year follows the clock
+        return DEFAULT_EARNINGS_MODEL.estimate(make, model, year)
     
     def update_earnings_estimate(self, make: str, model: str, year_range: str, earnings: int) -> bool:
         """Update earnings estimate in database (admin function)"""
@@ -516,6 +742,8 @@ class SupabaseLogger:
                 # Insert new record if update didn't find existing
                 response = self.client.table('earnings_lookup').insert(data).execute()
             
+            # Other processes pick the change up within EARNINGS_REFRESH_SECONDS
+            self.refresh_earnings_table()
             return True
             
         except Exception as e:
@@ -552,11 +780,12 @@ class SupabaseLogger:
             # For testing, return a fake ID when database fails
             return str(uuid.uuid4())
     
-    def get_seller_requests(self, seller_id: str, status: str = None) -> List[Dict]:
-        """Get contact requests for a seller"""
+    def get_seller_requests(self, seller_id: str, status: str = None, limit: int = None,
+                            cursor: str = None) -> Page:
+        """Get contact requests for a seller, newest first (all of them unless limit is set)"""
         if not self.client:
             print("No database connection - returning sample seller requests")
-            return self._get_sample_seller_requests(seller_id)
+            return Page(self._get_sample_seller_requests(seller_id))
         
         try:
             query = self.client.table('contact_requests')\
@@ -566,31 +795,28 @@ class SupabaseLogger:
             if status:
                 query = query.eq('status', status)
             
-            response = query.order('created_at', desc=True).execute()
-            return response.data if response.data else []
+            return keyset_page(query, limit, cursor)
             
         except Exception as e:
             print(f"Failed to fetch seller requests from database: {e}")
-            return self._get_sample_seller_requests(seller_id)
+            return Page(self._get_sample_seller_requests(seller_id))
     
-    def get_buyer_requests(self, buyer_id: str) -> List[Dict]:
-        """Get contact requests made by a buyer"""
+    def get_buyer_requests(self, buyer_id: str, limit: int = None, cursor: str = None) -> Page:
+        """Get contact requests made by a buyer, newest first (all of them unless limit is set)"""
         if not self.client:
             print("No database connection - returning sample buyer requests")
-            return self._get_sample_buyer_requests(buyer_id)
+            return Page(self._get_sample_buyer_requests(buyer_id))
         
         try:
-            response = self.client.table('contact_requests')\
+            query = self.client.table('contact_requests')\
                 .select('*, sellers:seller_id(email), listings:listing_id(year, make, model, location)')\
-                .eq('buyer_id', buyer_id)\
-                .order('created_at', desc=True)\
-                .execute()
+                .eq('buyer_id', buyer_id)
             
-            return response.data if response.data else []
+            return keyset_page(query, limit, cursor)
             
         except Exception as e:
             print(f"Failed to fetch buyer requests from database: {e}")
-            return self._get_sample_buyer_requests(buyer_id)
+            return Page(self._get_sample_buyer_requests(buyer_id))
     
     def update_contact_request_status(self, request_id: str, status: str) -> bool:
         """Update contact request status (accept/decline)"""
@@ -686,4 +912,28 @@ class SupabaseLogger:
             
         except Exception as e:
             print(f"Failed to upload image: {e}")
-            return None
\ No newline at end of file
+            return None
+
+# One SupabaseLogger per process, shared by app.py, auth.py and batch_check.py workers
+_shared_logger: Optional[SupabaseLogger] = None
+_shared_logger_lock = threading.Lock()
+
+
+def get_supabase_logger() -> SupabaseLogger:
+    """Process-wide SupabaseLogger, created on first use"""
+    global _shared_logger
+    if _shared_logger is None:
+        with _shared_logger_lock:
+            if _shared_logger is None:
+                _shared_logger = SupabaseLogger()
+    return _shared_logger
+
+
+def get_client_stats() -> Dict:
+    """Construction counts and HTTP pool settings for the shared Supabase client"""
+    return {
+        'loggers_created': SupabaseLogger.loggers_created,
+        'clients_created': SupabaseLogger.clients_created,
+        'pool_size': int(os.getenv('SUPABASE_POOL_SIZE', 20)),
+        'keepalive_seconds': float(os.getenv('SUPABASE_KEEPALIVE_SECONDS', 60))
+    }
@@ -0,0 +1,243 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+
+class LRUCache:
+    """Thread-safe in-process LRU cache with per-entry TTL"""
+
+    def __init__(self, max_size: int = 1024, ttl: Optional[float] = None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data: "OrderedDict[Any, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key) -> Optional[Any]:
+        """Return the cached value, or None if missing or expired"""
+        entry = self.get_entry(key)
+        return entry[0] if entry else None
+
+    def get_entry(self, key) -> Optional[tuple]:
+        """Return (value, stored_at), or None if missing or expired"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            if self.ttl is not None and time.time() - entry[1] > self.ttl:
+                del self._data[key]
+                self.misses += 1
+                return None
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def set(self, key, value, stored_at: Optional[float] = None):
+        """Store a value, evicting the least recently used entry when full"""
+        with self._lock:
+            self._data[key] = (value, stored_at if stored_at is not None else time.time())
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get_stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._data),
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+
+class SQLiteStore:
+    """On-disk decode store shared by every worker process on the host"""
+
+    def __init__(self, path: str, max_size: int = 100000):
+        self.path = path
+        self.max_size = max_size
+        self._local = threading.local()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        conn = self._connect()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS vin_decodes ("
+            "vin TEXT PRIMARY KEY, "
+            "data TEXT NOT NULL, "
+            "stored_at REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_vin_decodes_stored_at ON vin_decodes(stored_at)")
+        conn.commit()
+
+    def _connect(self) -> sqlite3.Connection:
+        # sqlite3 connections cannot be shared between threads, so keep one per thread
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, vin: str) -> Optional[tuple]:
+        """Return (vehicle_info, stored_at) or None"""
+        row = self._connect().execute(
+            "SELECT data, stored_at FROM vin_decodes WHERE vin = ?", (vin,)
+        ).fetchone()
+        if not row:
+            return None
+        return json.loads(row[0]), row[1]
+
+    def set(self, vin: str, vehicle_info: Dict, stored_at: float):
+        conn = self._connect()
+        conn.execute(
+            "INSERT OR REPLACE INTO vin_decodes (vin, data, stored_at) VALUES (?, ?, ?)",
+            (vin, json.dumps(vehicle_info), stored_at)
+        )
+        conn.commit()
+
+    def evict(self, ttl: Optional[float]) -> int:
+        """Drop expired rows, then the oldest rows beyond max_size"""
+        conn = self._connect()
+        removed = 0
+        if ttl is not None:
+            removed += conn.execute(
+                "DELETE FROM vin_decodes WHERE stored_at < ?", (time.time() - ttl,)
+            ).rowcount
+        removed += conn.execute(
+            "DELETE FROM vin_decodes WHERE vin IN ("
+            "SELECT vin FROM vin_decodes ORDER BY stored_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_size,)
+        ).rowcount
+        conn.commit()
+        return removed
+
+    def count(self) -> int:
+        return self._connect().execute("SELECT COUNT(*) FROM vin_decodes").fetchone()[0]
+
+    def clear(self):
+        conn = self._connect()
+        conn.execute("DELETE FROM vin_decodes")
+        conn.commit()
+
+
+class VINCache:
+    """Two-tier VIN decode cache: in-process LRU backed by a shared SQLite file"""
+
+    def __init__(self, path: Optional[str] = None, ttl: Optional[float] = None,
+                 max_size: Optional[int] = None, disk_max_size: Optional[int] = None,
+                 max_stale: Optional[float] = None):
+        self.ttl = ttl if ttl is not None else float(os.getenv('VIN_CACHE_TTL', 30 * 24 * 3600))
+        # Expired decodes are kept this much longer so they can be served stale while refreshing
+        self.max_stale = max_stale if max_stale is not None else float(os.getenv('VIN_CACHE_MAX_STALE', 365 * 24 * 3600))
+        max_size = max_size if max_size is not None else int(os.getenv('VIN_CACHE_MAX_SIZE', 2048))
+        disk_max_size = disk_max_size if disk_max_size is not None else int(os.getenv('VIN_CACHE_DISK_MAX_SIZE', 100000))
+        path = path if path is not None else os.getenv('VIN_CACHE_PATH', os.path.join('instance', 'vin_cache.sqlite3'))
+
+        self.memory = LRUCache(max_size=max_size, ttl=self.ttl + self.max_stale)
+        self.disk: Optional[SQLiteStore] = None
+        self.disk_hits = 0
+        self.disk_misses = 0
+        self._writes = 0
+
+        if path:
+            try:
+                self.disk = SQLiteStore(path, max_size=disk_max_size)
+            except Exception as e:
+                print(f"VIN disk cache unavailable, using memory only: {e}")
+                self.disk = None
+
+    @staticmethod
+    def normalize(vin: str) -> str:
+        return (vin or '').strip().upper()
+
+    def get(self, vin: str) -> Optional[Dict]:
+        """Return a fresh cached decode for this VIN, or None"""
+        vehicle_info, fresh = self.lookup(vin)
+        return vehicle_info if fresh else None
+
+    def lookup(self, vin: str) -> tuple:
+        """Return (vehicle_info, is_fresh); expired decodes within max_stale come back with is_fresh False"""
+        key = self.normalize(vin)
+        entry = self.memory.get_entry(key)
+
+        if entry is None and self.disk:
+            try:
+                entry = self.disk.get(key)
+            except Exception as e:
+                print(f"VIN disk cache read failed: {e}")
+                entry = None
+
+            if entry is None or time.time() - entry[1] > self.ttl + self.max_stale:
+                self.disk_misses += 1
+                return None, False
+
+            self.disk_hits += 1
+            # Promote to the memory tier, keeping the original timestamp so TTL still holds
+            self.memory.set(key, entry[0], stored_at=entry[1])
+
+        if entry is None:
+            return None, False
+
+        vehicle_info, stored_at = entry
+        return dict(vehicle_info), time.time() - stored_at <= self.ttl
+
+    def set(self, vin: str, vehicle_info: Dict):
+        """Store a successful decode in both tiers"""
+        key = self.normalize(vin)
+        stored_at = time.time()
+        self.memory.set(key, dict(vehicle_info), stored_at=stored_at)
+
+        if not self.disk:
+            return
+
+        try:
+            self.disk.set(key, vehicle_info, stored_at)
+            self._writes += 1
+            # Amortize disk eviction instead of running it on every write
+            if self._writes % 500 == 0:
+                self.disk.evict(self.ttl + self.max_stale)
+        except Exception as e:
+            print(f"VIN disk cache write failed: {e}")
+
+    def clear(self):
+        self.memory.clear()
+        if self.disk:
+            self.disk.clear()
+
+    def get_stats(self) -> Dict:
+        stats = {'ttl_seconds': self.ttl, 'max_stale_seconds': self.max_stale, 'memory': self.memory.get_stats()}
+        if self.disk:
+            try:
+                disk_size = self.disk.count()
+            except Exception:
+                disk_size = None
+            stats['disk'] = {
+                'path': self.disk.path,
+                'size': disk_size,
+                'max_size': self.disk.max_size,
+                'hits': self.disk_hits,
+                'misses': self.disk_misses
+            }
+        return stats
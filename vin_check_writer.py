@@ -0,0 +1,216 @@
+import atexit
+import glob
+import json
+import os
+import queue
+import threading
+import time
+from typing import Callable, Dict, List
+
+
+class VINCheckWriter:
+    """Write-behind buffer for vin_checks rows.
+
+    /check hands rows to submit(), which never waits on Supabase: a background
+    thread drains the bounded queue and inserts rows in batches of batch_size,
+    or whatever has arrived after flush_interval seconds. When the queue is
+    full, or inserts fail, rows are appended to a per-process NDJSON spill
+    file instead of being dropped. After the next successful insert a process
+    replays its own spill file and those of processes that have exited (never
+    a live process's file, which its owner may still be appending to);
+    unreadable lines are moved to a vin_checks_rejected file rather than
+    blocking the replay. The queue is drained on interpreter shutdown.
+    """
+
+    def __init__(self, insert_rows: Callable[[List[Dict]], None], max_queue: int = 10000,
+                 batch_size: int = 200, flush_interval: float = 2.0,
+                 spill_dir: str = 'instance', retry_interval: float = 30):
+        self.insert_rows = insert_rows
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.retry_interval = retry_interval
+        self.spill_dir = spill_dir
+        self._queue: "queue.Queue[Dict]" = queue.Queue(maxsize=max_queue)
+        self._spill_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._down_until = 0.0
+
+        self.submitted = 0
+        self.inserted = 0
+        self.batches = 0
+        self.insert_failures = 0
+        self.spilled = 0
+        self.replayed = 0
+
+        self._thread = threading.Thread(target=self._run, name='vin-check-writer', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    @property
+    def spill_path(self) -> str:
+        return os.path.join(self.spill_dir, f"vin_checks_spill.{os.getpid()}.ndjson")
+
+    def submit(self, row: Dict) -> bool:
+        """Queue a row for insertion; never blocks the request"""
+        self.submitted += 1
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            # Backpressure: writer cannot keep up, so keep the row on local disk instead
+            self._spill([row])
+        return True
+
+    def _spill(self, rows: List[Dict]):
+        try:
+            with self._spill_lock:
+                os.makedirs(self.spill_dir, exist_ok=True)
+                with open(self.spill_path, 'a') as f:
+                    f.writelines(json.dumps(row) + '\n' for row in rows)
+            self.spilled += len(rows)
+        except Exception as e:
+            print(f"Failed to spill {len(rows)} VIN checks to {self.spill_path}: {e}")
+
+    def _collect_batch(self) -> List[Dict]:
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 and batch:
+                break
+            try:
+                batch.append(self._queue.get(timeout=max(remaining, 0.05)))
+            except queue.Empty:
+                if batch or self._stop.is_set():
+                    break
+                deadline = time.monotonic() + self.flush_interval
+        return batch
+
+    def _flush(self, batch: List[Dict]) -> bool:
+        if time.monotonic() < self._down_until:
+            self._spill(batch)
+            return False
+        try:
+            self.insert_rows(batch)
+        except Exception as e:
+            self.insert_failures += 1
+            self._down_until = time.monotonic() + self.retry_interval
+            print(f"Failed to insert {len(batch)} VIN checks, spilling to disk: {e}")
+            self._spill(batch)
+            return False
+
+        self.inserted += len(batch)
+        self.batches += 1
+        return True
+
+    @staticmethod
+    def _pid_alive(pid: int) -> bool:
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except OSError:
+            return True  # exists, owned by someone else
+        return True
+
+    def _claimable(self, owner: str) -> bool:
+        """Only this process's files and those of exited processes; a live owner may still be appending"""
+        try:
+            pid = int(owner)
+        except ValueError:
+            return False
+        return pid == os.getpid() or not self._pid_alive(pid)
+
+    def _replayable_spills(self) -> List[str]:
+        """This process's spill file, files left by exited processes, and claims abandoned mid-replay"""
+        paths = []
+        for path in glob.glob(os.path.join(self.spill_dir, 'vin_checks_spill.*.ndjson')):
+            if self._claimable(os.path.basename(path).split('.')[1]):
+                paths.append(path)
+        for path in glob.glob(os.path.join(self.spill_dir, 'vin_checks_spill.*.ndjson.replaying.*')):
+            if self._claimable(path.rsplit('.', 1)[1]):
+                paths.append(path)
+        return paths
+
+    def _read_spill(self, path: str) -> List[Dict]:
+        """Rows from a spill file; unparseable lines (e.g. torn writes) go to a rejected file"""
+        rows, rejected = [], []
+        with open(path) as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    rows.append(json.loads(line))
+                except ValueError:
+                    rejected.append(line if line.endswith('\n') else line + '\n')
+        if rejected:
+            rejected_path = os.path.join(self.spill_dir, f"vin_checks_rejected.{os.getpid()}.ndjson")
+            print(f"Skipping {len(rejected)} unreadable lines in {path}, kept in {rejected_path}")
+            with open(rejected_path, 'a') as f:
+                f.writelines(rejected)
+        return rows
+
+    def _replay_spills(self):
+        """Claim spill files (atomic rename, so one process per file) and insert them.
+
+        Our own file is renamed under _spill_lock, and _spill reopens the path on
+        every append, so later spills start a fresh file instead of writing into
+        the claimed one.
+        """
+        for path in self._replayable_spills():
+            base = path.split('.replaying.', 1)[0]
+            claimed = f"{base}.replaying.{os.getpid()}"
+            try:
+                with self._spill_lock:
+                    os.replace(path, claimed)
+            except OSError:
+                continue  # another process got it first
+
+            rows = self._read_spill(claimed)
+            for start in range(0, len(rows), self.batch_size):
+                if not self._flush(rows[start:start + self.batch_size]):
+                    # Unsent rows were re-spilled by _flush; the rest go back too
+                    self._spill(rows[start + self.batch_size:])
+                    break
+                self.replayed += len(rows[start:start + self.batch_size])
+            os.remove(claimed)
+
+    def _run(self):
+        last_replay_check = 0.0
+        while not (self._stop.is_set() and self._queue.empty()):
+            try:
+                batch = self._collect_batch()
+                if batch and self._flush(batch) and time.monotonic() - last_replay_check > self.retry_interval:
+                    last_replay_check = time.monotonic()
+                    self._replay_spills()
+            except Exception as e:
+                # Keep the writer alive; a dead thread would silently strand every later row in the queue
+                print(f"VIN check writer error: {e}")
+                self._stop.wait(self.flush_interval)
+
+    def close(self, timeout: float = 10):
+        """Flush queued rows before exit; anything left after the timeout is spilled"""
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        self._thread.join(timeout)
+        leftover = []
+        while True:
+            try:
+                leftover.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        if leftover:
+            self._spill(leftover)
+
+    def get_stats(self) -> Dict:
+        return {
+            'queued': self._queue.qsize(),
+            'max_queue': self._queue.maxsize,
+            'submitted': self.submitted,
+            'inserted': self.inserted,
+            'batches': self.batches,
+            'insert_failures': self.insert_failures,
+            'spilled': self.spilled,
+            'replayed': self.replayed,
+            'supabase_down': time.monotonic() < self._down_until
+        }
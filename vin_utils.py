@@ -1,10 +1,155 @@
+import os
+import random
 import requests
 import re
-from typing import Dict, Optional
+import threading
+import time
+from datetime import datetime
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Optional
+from vin_cache import VINCache
+from circuit_breaker import CircuitBreaker, CircuitOpenError
+from rate_limiter import SharedTokenBucket
+from vpic_local import LocalVPICDatabase
 
-class VINDecoder:
+# vPIC accepts at most 50 VINs per DecodeVINValuesBatch call
+BATCH_SIZE = 50
+
+# DecodeVinValues / DecodeVINValuesBatch column -> vehicle_info field
+VEHICLE_FIELD_MAP = (
+    ('make', 'Make', str),
+    ('model', 'Model', str),
+    ('year', 'ModelYear', int),
+    ('body_class', 'BodyClass', str),
+    ('trim', 'Trim', str),
+    ('fuel_type', 'FuelTypePrimary', str),
+    ('drive_type', 'DriveType', str),
+    ('gvwr', 'GVWR', str),
+)
+
+# A local snapshot decode is only trusted when it pins down the vehicle itself; make (from the WMI)
+# and year (position 10) resolve for almost any VIN, including models newer than the snapshot
+LOCAL_DECODE_REQUIRED_FIELDS = ('make', 'model', 'year', 'body_class')
+
+# Check digit (position 9) transliteration values and positional weights, per 49 CFR 565
+VIN_TRANSLITERATION = {
+    'A': 1, 'B': 2, 'C': 3, 'D': 4, 'E': 5, 'F': 6, 'G': 7, 'H': 8,
+    'J': 1, 'K': 2, 'L': 3, 'M': 4, 'N': 5, 'P': 7, 'R': 9,
+    'S': 2, 'T': 3, 'U': 4, 'V': 5, 'W': 6, 'X': 7, 'Y': 8, 'Z': 9,
+    **{str(digit): digit for digit in range(10)}
+}
+VIN_WEIGHTS = (8, 7, 6, 5, 4, 3, 2, 10, 0, 9, 8, 7, 6, 5, 4, 3, 2)
+
+# Model year codes (position 10) repeat every 30 years starting at 1980
+MODEL_YEAR_CODES = 'ABCDEFGHJKLMNPRSTVWXY123456789'
+
+class JitteredRetry(Retry):
+    """urllib3 Retry that adds random jitter to the exponential backoff"""
+    backoff_jitter_max = 0.5
+    
+    def get_backoff_time(self) -> float:
+        return super().get_backoff_time() + random.uniform(0, self.backoff_jitter_max)
+
+class _InFlightDecode:
+    """A decode in progress that concurrent callers for the same VIN wait on"""
     def __init__(self):
-        self.base_url = "https://vpic.nhtsa.dot.gov/api/vehicles/DecodeVin"
+        self.done = threading.Event()
+        self.result: Optional[Dict] = None
+        self.error: Optional[BaseException] = None
+
+class VINDecoder:
+    def __init__(self, cache: Optional[VINCache] = None, max_batch_workers: int = 4,
+                 pool_size: Optional[int] = None, max_retries: Optional[int] = None,
+                 connect_timeout: Optional[float] = None, read_timeout: Optional[float] = None,
+                 base_url: Optional[str] = None, rate_limiter: Optional[SharedTokenBucket] = None,
+                 local_db: Optional[LocalVPICDatabase] = None):
+        # VPIC_BASE_URL lets load tests point at vpic_stub_server.py instead of NHTSA
+        base_url = base_url or os.getenv('VPIC_BASE_URL', 'https://vpic.nhtsa.dot.gov/api/vehicles')
+        self.base_url = base_url.rstrip('/')
+        self.cache = cache
+        self.max_batch_workers = max_batch_workers
+        
+        pool_size = pool_size if pool_size is not None else int(os.getenv('VPIC_POOL_SIZE', 10))
+        max_retries = max_retries if max_retries is not None else int(os.getenv('VPIC_MAX_RETRIES', 2))
+        connect_timeout = connect_timeout if connect_timeout is not None else float(os.getenv('VPIC_CONNECT_TIMEOUT', 3.05))
+        read_timeout = read_timeout if read_timeout is not None else float(os.getenv('VPIC_READ_TIMEOUT', 10))
+        self.timeout = (connect_timeout, read_timeout)
+        
+        # One keep-alive session per decoder so repeat calls skip the TCP+TLS handshake
+        self.session = self._build_session(pool_size, max_retries)
+        
+        # Single-flight state: normalized VIN -> decode currently in progress
+        self._in_flight: Dict[str, _InFlightDecode] = {}
+        self._in_flight_lock = threading.Lock()
+        self.network_decodes = 0
+        self.coalesced_decodes = 0
+        
+        # decode_vins() counters; chunks are fetched from several threads
+        self._batch_stats_lock = threading.Lock()
+        self.batch_requests = 0
+        self.batch_decoded_vins = 0
+        
+        # Offline pre-screen counters
+        self.prescreened = 0
+        self.prescreen_bad_check_digit = 0
+        self.prescreen_too_old = 0
+        
+        # Fail fast instead of tying up workers while vPIC is down or slow
+        self.breaker = CircuitBreaker(
+            'nhtsa_vpic',
+            failure_threshold=int(os.getenv('VPIC_BREAKER_FAILURES', 5)),
+            reset_timeout=float(os.getenv('VPIC_BREAKER_RESET_SECONDS', 30)),
+            slow_call_seconds=float(os.getenv('VPIC_BREAKER_SLOW_SECONDS', 5))
+        )
+        self.stale_served = 0
+        self.background_refreshes = 0
+        
+        # Outbound budget shared by all workers so bursts queue instead of tripping vPIC throttling
+        self.rate_limiter = rate_limiter
+        rate = float(os.getenv('VPIC_RATE_LIMIT', 10))
+        if self.rate_limiter is None and rate > 0:
+            try:
+                self.rate_limiter = SharedTokenBucket(
+                    os.getenv('VPIC_RATE_LIMIT_PATH', os.path.join('instance', 'vpic_rate_limit.state')),
+                    rate=rate,
+                    capacity=float(os.getenv('VPIC_RATE_LIMIT_BURST', 20))
+                )
+            except OSError as e:
+                print(f"Outbound rate limiter unavailable: {e}")
+        self.rate_limit_wait = float(os.getenv('VPIC_RATE_LIMIT_WAIT', 3))
+        self.rate_limited = 0
+        
+        # Optional offline vPIC snapshot (see vpic_local.py); the API is only a fallback
+        self.local_db = local_db
+        local_path = os.getenv('VPIC_LOCAL_DB')
+        if self.local_db is None and local_path:
+            try:
+                self.local_db = LocalVPICDatabase(local_path)
+            except Exception as e:
+                print(f"Local vPIC database unavailable, using the API only: {e}")
+        self.local_decodes = 0
+        self.local_misses = 0
+    
+    def _build_session(self, pool_size: int, max_retries: int) -> requests.Session:
+        """Create a pooled session that retries timeouts, throttling and 5xx responses"""
+        retry = JitteredRetry(
+            total=max_retries,
+            connect=max_retries,
+            read=max_retries,
+            status=max_retries,
+            backoff_factor=0.3,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset({'GET', 'POST'}),
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        
+        session = requests.Session()
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
     
     def validate_vin(self, vin: str) -> bool:
         """Validate VIN format (17 characters, alphanumeric excluding I, O, Q)"""
@@ -15,52 +160,326 @@ class VINDecoder:
         pattern = r'^[A-HJ-NPR-Z0-9]{17}$'
         return bool(re.match(pattern, vin.upper()))
     
+    def validate_check_digit(self, vin: str) -> bool:
+        """Verify the position 9 check digit without any network call"""
+        vin = vin.upper()
+        total = sum(VIN_TRANSLITERATION.get(char, 0) * weight for char, weight in zip(vin, VIN_WEIGHTS))
+        remainder = total % 11
+        expected = 'X' if remainder == 10 else str(remainder)
+        return vin[8] == expected
+    
+    def decode_model_year(self, vin: str, current_year: Optional[int] = None) -> Optional[int]:
+        """Decode position 10 to the most recent model year it can stand for"""
+        code = vin[9].upper()
+        if code not in MODEL_YEAR_CODES:
+            return None
+        
+        current_year = current_year or datetime.now().year
+        # Model years may run one year ahead of the calendar
+        latest_allowed = current_year + 1
+        year = 1980 + MODEL_YEAR_CODES.index(code)
+        while year + 30 <= latest_allowed:
+            year += 30
+        return year
+    
+    def prescreen(self, vin: str, max_vehicle_age: int, current_year: Optional[int] = None) -> Dict:
+        """Cheap local checks that can settle a VIN before calling NHTSA.
+        
+        Returns {'status', 'model_year'} where status is 'invalid_check_digit',
+        'too_old' or 'ok'. The model year is the newest one the year code allows,
+        so 'too_old' only fires when every reading of the code is over the limit.
+        """
+        current_year = current_year or datetime.now().year
+        self.prescreened += 1
+        
+        if not self.validate_check_digit(vin):
+            self.prescreen_bad_check_digit += 1
+            return {'status': 'invalid_check_digit', 'model_year': None}
+        
+        model_year = self.decode_model_year(vin, current_year)
+        if model_year and current_year - model_year > max_vehicle_age:
+            self.prescreen_too_old += 1
+            return {'status': 'too_old', 'model_year': model_year}
+        
+        return {'status': 'ok', 'model_year': model_year}
+    
     def decode_vin(self, vin: str) -> Optional[Dict]:
-        """Decode VIN using NHTSA API"""
+        """Decode VIN, serving repeat lookups from the cache before calling NHTSA"""
         if not self.validate_vin(vin):
             return None
         
+        vin = vin.upper()
+        
+        if self.cache:
+            cached, fresh = self.cache.lookup(vin)
+            if cached and fresh:
+                return cached
+            if cached:
+                # Stale-while-revalidate: answer now, refresh off the request path
+                self.stale_served += 1
+                self._refresh_in_background(vin)
+                return cached
+        
+        vehicle_info = self._decode_locally(vin)
+        if vehicle_info:
+            return vehicle_info
+        
+        return self._decode_single_flight(vin)
+    
+    def _decode_locally(self, vin: str) -> Optional[Dict]:
+        """Decode from the local vPIC snapshot, caching the result; None unless it resolves LOCAL_DECODE_REQUIRED_FIELDS"""
+        if not self.local_db:
+            return None
+        
         try:
-            url = f"{self.base_url}/{vin.upper()}?format=json"
-            response = requests.get(url, timeout=10)
-            response.raise_for_status()
+            row = self.local_db.decode(vin)
+        except Exception as e:
+            print(f"Local vPIC decode failed for {vin}: {e}")
+            row = None
+        
+        vehicle_info = self._parse_values_row(row) if row else None
+        if not vehicle_info or not all(vehicle_info.get(field) for field in LOCAL_DECODE_REQUIRED_FIELDS):
+            # Incomplete decodes fall through to the API rather than caching model=None for weeks
+            self.local_misses += 1
+            return None
+        
+        self.local_decodes += 1
+        if self.cache:
+            self.cache.set(vin, vehicle_info)
+        return vehicle_info
+    
+    def _refresh_in_background(self, vin: str):
+        """Re-decode a stale VIN on a daemon thread unless a decode is already running"""
+        with self._in_flight_lock:
+            if vin in self._in_flight:
+                return
+        
+        if self.breaker.is_open():
+            return
+        
+        self.background_refreshes += 1
+        threading.Thread(target=self._decode_single_flight, args=(vin,), daemon=True).start()
+    
+    def _decode_single_flight(self, vin: str) -> Optional[Dict]:
+        """Fetch a VIN, letting concurrent callers share one in-flight NHTSA request"""
+        with self._in_flight_lock:
+            call = self._in_flight.get(vin)
+            is_leader = call is None
+            if is_leader:
+                call = _InFlightDecode()
+                self._in_flight[vin] = call
+                self.network_decodes += 1
+            else:
+                self.coalesced_decodes += 1
+        
+        if not is_leader:
+            call.done.wait()
+            if call.error:
+                raise call.error
+            return dict(call.result) if call.result else None
+        
+        try:
+            call.result = self._fetch_vin(vin)
             
-            data = response.json()
+            # Only successful decodes are cached; make/model/year never change for a VIN
+            if call.result and self.cache:
+                self.cache.set(vin, call.result)
             
-            if 'Results' not in data:
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._in_flight_lock:
+                self._in_flight.pop(vin, None)
+            call.done.set()
+    
+    def _fetch_vin(self, vin: str) -> Optional[Dict]:
+        """Decode VIN using the flat NHTSA DecodeVinValues response"""
+        # Fail fast while open, before spending time or shared budget on a rate limit token
+        if self.breaker.reject_if_open():
+            return None
+        
+        # Then token before allow_request(), so a half-open breaker trial is not left hanging
+        if not self._acquire_rate_limit():
+            return None
+        
+        if not self.breaker.allow_request():
+            return None
+        
+        started = time.monotonic()
+        try:
+            url = f"{self.base_url}/DecodeVinValues/{vin.upper()}?format=json"
+            response = self.session.get(url, timeout=self.timeout)
+            response.raise_for_status()
+        except requests.RequestException:
+            self.breaker.record_failure()
+            return None
+        self.breaker.record_success(time.monotonic() - started)
+        
+        try:
+            results = response.json().get('Results')
+            if not results:
                 return None
             
-            # Extract relevant information
-            vehicle_info = {
-                'make': None,
-                'model': None,
-                'year': None,
-                'body_class': None,
-                'title_status': 'Unknown - Verification Required'  # NHTSA doesn't provide title status
-            }
+            return self._parse_values_row(results[0])
             
-            for result in data['Results']:
-                variable = result.get('Variable', '').lower()
-                value = result.get('Value')
-                
-                if value and value != 'Not Applicable':
-                    if 'make' in variable and not vehicle_info['make']:
-                        vehicle_info['make'] = value
-                    elif 'model' in variable and 'year' not in variable and not vehicle_info['model']:
-                        vehicle_info['model'] = value
-                    elif 'model year' in variable:
-                        try:
-                            vehicle_info['year'] = int(value)
-                        except (ValueError, TypeError):
-                            pass
-                    elif 'body class' in variable:
-                        vehicle_info['body_class'] = value
-                    # Note: NHTSA API does not provide title/brand status information
-                    # Title status must be verified through state DMV records
+        except Exception:
+            return None
+    
+    def _acquire_rate_limit(self) -> bool:
+        """Wait for an outbound request token; False once the deadline passes"""
+        if not self.rate_limiter:
+            return True
+        
+        if self.rate_limiter.acquire(self.rate_limit_wait):
+            return True
+        
+        self.rate_limited += 1
+        return False
+    
+    def decode_vins(self, vins: List[str]) -> List[Dict]:
+        """Decode many VINs through the vPIC batch endpoint.
+        
+        Returns one {'vin', 'vehicle_info', 'error'} dict per input VIN, in input order.
+        """
+        results = []
+        pending = {}  # normalized VIN -> indexes in results
+        stale = {}  # normalized VIN -> expired cached decode, used if the refetch fails
+        
+        for index, vin in enumerate(vins):
+            normalized = (vin or '').strip().upper()
+            results.append({'vin': normalized, 'vehicle_info': None, 'error': None})
+            
+            if not self.validate_vin(normalized):
+                results[index]['error'] = 'Invalid VIN format'
+                continue
             
-            return vehicle_info if vehicle_info['make'] and vehicle_info['year'] else None
+            if self.cache:
+                cached, fresh = self.cache.lookup(normalized)
+                if cached and fresh:
+                    results[index]['vehicle_info'] = cached
+                    continue
+                if cached:
+                    stale[normalized] = cached
             
+            vehicle_info = self._decode_locally(normalized)
+            if vehicle_info:
+                results[index]['vehicle_info'] = vehicle_info
+                continue
+            
+            pending.setdefault(normalized, []).append(index)
+        
+        if not pending:
+            return results
+        
+        unique_vins = list(pending)
+        chunks = [unique_vins[i:i + BATCH_SIZE] for i in range(0, len(unique_vins), BATCH_SIZE)]
+        
+        with ThreadPoolExecutor(max_workers=min(self.max_batch_workers, len(chunks))) as executor:
+            futures = {executor.submit(self._fetch_batch, chunk): chunk for chunk in chunks}
+            
+            for future in as_completed(futures):
+                chunk = futures[future]
+                try:
+                    decoded = future.result()
+                    chunk_error = None
+                except Exception as e:
+                    decoded = {}
+                    chunk_error = f"NHTSA batch request failed: {e}"
+                
+                for vin in chunk:
+                    vehicle_info = decoded.get(vin)
+                    if vehicle_info and self.cache:
+                        self.cache.set(vin, vehicle_info)
+                    elif chunk_error and vin in stale:
+                        vehicle_info = stale[vin]
+                        self.stale_served += 1
+                    
+                    for index in pending[vin]:
+                        if vehicle_info:
+                            results[index]['vehicle_info'] = dict(vehicle_info)
+                        else:
+                            results[index]['error'] = chunk_error or 'Unable to decode VIN'
+        
+        return results
+    
+    def _fetch_batch(self, vins: List[str]) -> Dict[str, Optional[Dict]]:
+        """Decode up to BATCH_SIZE VINs in one DecodeVINValuesBatch POST"""
+        if self.breaker.reject_if_open():
+            raise CircuitOpenError("NHTSA circuit is open")
+        
+        if not self._acquire_rate_limit():
+            raise RuntimeError("NHTSA outbound rate limit wait exceeded")
+        
+        if not self.breaker.allow_request():
+            raise CircuitOpenError("NHTSA circuit is open")
+        
+        with self._batch_stats_lock:
+            self.batch_requests += 1
+        
+        started = time.monotonic()
+        try:
+            response = self.session.post(
+                f"{self.base_url}/DecodeVINValuesBatch/",
+                data={'format': 'json', 'data': ';'.join(vins)},
+                timeout=(self.timeout[0], self.timeout[1] * 3)
+            )
+            response.raise_for_status()
         except requests.RequestException:
-            return None
-        except Exception:
-            return None
\ No newline at end of file
+            self.breaker.record_failure()
+            raise
+        # Batch calls legitimately take longer, so only count them slow past 3x the threshold
+        self.breaker.record_success((time.monotonic() - started) / 3)
+        
+        decoded = {}
+        for row in response.json().get('Results', []):
+            vin = (row.get('VIN') or '').strip().upper()
+            if vin:
+                decoded[vin] = self._parse_values_row(row)
+        
+        with self._batch_stats_lock:
+            self.batch_decoded_vins += sum(1 for vehicle_info in decoded.values() if vehicle_info)
+        return decoded
+    
+    def _parse_values_row(self, row: Dict) -> Optional[Dict]:
+        """Extract vehicle info from a flat DecodeVinValues result row using VEHICLE_FIELD_MAP"""
+        vehicle_info = {}
+        for field, variable, convert in VEHICLE_FIELD_MAP:
+            raw = row.get(variable)
+            value = None
+            if raw and raw != 'Not Applicable':
+                try:
+                    value = convert(raw)
+                except (ValueError, TypeError):
+                    value = None
+            vehicle_info[field] = value
+        
+        # Note: NHTSA API does not provide title/brand status information
+        # Title status must be verified through state DMV records
+        vehicle_info['title_status'] = 'Unknown - Verification Required'
+        
+        return vehicle_info if vehicle_info['make'] and vehicle_info['year'] else None
+    
+    def get_stats(self) -> Dict:
+        """Decoder counters for the debug endpoint"""
+        return {
+            'network_decodes': self.network_decodes,
+            'coalesced_decodes': self.coalesced_decodes,
+            'batch_requests': self.batch_requests,
+            'batch_decoded_vins': self.batch_decoded_vins,
+            'prescreen': {
+                'checked': self.prescreened,
+                'bad_check_digit': self.prescreen_bad_check_digit,
+                'too_old': self.prescreen_too_old,
+                'network_skipped': self.prescreen_bad_check_digit + self.prescreen_too_old
+            },
+            'local_decodes': self.local_decodes,
+            'local_misses': self.local_misses,
+            'stale_served': self.stale_served,
+            'background_refreshes': self.background_refreshes,
+            'circuit_breaker': self.breaker.get_state(),
+            'rate_limited': self.rate_limited,
+            'rate_limiter': self.rate_limiter.get_stats() if self.rate_limiter else None,
+            'cache': self.cache.get_stats() if self.cache else None
+        }
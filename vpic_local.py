@@ -0,0 +1,257 @@
+"""Offline VIN decoding from a local copy of the NHTSA vPIC standalone database.
+
+NHTSA publishes vPIC as a SQL Server backup (vPICList_lite). Export its tables
+to CSV (one <Table>.csv per table, header row included) and import them:
+
+    python vpic_local.py --source ./vpic_csv --output instance/vpic.sqlite3
+
+Then set VPIC_LOCAL_DB=instance/vpic.sqlite3; VINDecoder decodes locally and
+falls back to the API unless the local data resolves every field in
+vin_utils.LOCAL_DECODE_REQUIRED_FIELDS (make, model, year and body class).
+Make and year resolve for almost any VIN, so a snapshot older than the
+vehicle would otherwise return a decode without a model.
+"""
+import argparse
+import csv
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, Optional
+
+# Tables (and the columns we keep) needed to resolve make/model/year/body and friends
+IMPORT_TABLES = {
+    'Wmi': ['Id', 'Wmi', 'MakeId', 'VehicleTypeId'],
+    'Wmi_Make': ['WmiId', 'MakeId'],
+    'Wmi_VinSchema': ['Id', 'WmiId', 'VinSchemaId', 'YearFrom', 'YearTo'],
+    'Pattern': ['Id', 'VinSchemaId', 'Keys', 'ElementId', 'AttributeId'],
+    'Element': ['Id', 'Name', 'Code', 'LookupTable'],
+    'Make': ['Id', 'Name'],
+    'Model': ['Id', 'Name'],
+    'BodyStyle': ['Id', 'Name'],
+    'FuelType': ['Id', 'Name'],
+    'DriveType': ['Id', 'Name'],
+    'GrossVehicleWeightRating': ['Id', 'Name'],
+}
+
+INDEXES = [
+    "CREATE INDEX idx_wmi_wmi ON Wmi(Wmi)",
+    "CREATE INDEX idx_wmi_make_wmi ON Wmi_Make(WmiId)",
+    "CREATE INDEX idx_wmi_vinschema_wmi ON Wmi_VinSchema(WmiId, YearFrom, YearTo)",
+    "CREATE INDEX idx_pattern_schema_element ON Pattern(VinSchemaId, ElementId)",
+    "CREATE INDEX idx_element_code ON Element(Code)",
+]
+
+# Element codes match the DecodeVinValues column names VINDecoder already parses
+DECODED_ELEMENT_CODES = ('Make', 'Model', 'BodyClass', 'Trim', 'FuelTypePrimary', 'DriveType', 'GVWR')
+
+MODEL_YEAR_CODES = 'ABCDEFGHJKLMNPRSTVWXY123456789'
+
+
+def import_vpic(source_dir: str, output_path: str, progress=print) -> Dict[str, int]:
+    """Load vPIC CSV exports into a fresh SQLite file, replacing output_path atomically"""
+    files = {name.lower(): os.path.join(source_dir, name) for name in os.listdir(source_dir)}
+    missing = [table for table in IMPORT_TABLES if f"{table.lower()}.csv" not in files]
+    if missing:
+        raise FileNotFoundError(f"Missing CSV exports for: {', '.join(missing)}")
+
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    tmp_path = f"{output_path}.importing"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    conn = sqlite3.connect(tmp_path)
+    conn.execute("PRAGMA journal_mode=OFF")
+    conn.execute("PRAGMA synchronous=OFF")
+    counts = {}
+
+    try:
+        for table, columns in IMPORT_TABLES.items():
+            started = time.time()
+            # Ids and years get INTEGER affinity; AttributeId stays text since it may hold literal values
+            column_defs = [
+                f"{column} INTEGER" if column in ('YearFrom', 'YearTo') or (column.endswith('Id') and column != 'AttributeId')
+                else f"{column} TEXT"
+                for column in columns
+            ]
+            conn.execute(f"CREATE TABLE {table} ({', '.join(column_defs)})")
+            insert_sql = f"INSERT INTO {table} VALUES ({', '.join('?' for _ in columns)})"
+
+            with open(files[f"{table.lower()}.csv"], newline='', encoding='utf-8-sig') as f:
+                reader = csv.DictReader(f)
+                # Exports differ in header case, so match columns case-insensitively
+                header = {name.lower(): name for name in reader.fieldnames or []}
+                source_columns = [header.get(column.lower()) for column in columns]
+
+                batch = []
+                count = 0
+                for row in reader:
+                    batch.append([row[col] if col and row[col] != '' else None for col in source_columns])
+                    if len(batch) >= 10000:
+                        conn.executemany(insert_sql, batch)
+                        count += len(batch)
+                        batch = []
+                if batch:
+                    conn.executemany(insert_sql, batch)
+                    count += len(batch)
+
+            counts[table] = count
+            progress(f"Imported {count:,} rows into {table} in {time.time() - started:.1f}s")
+
+        for statement in INDEXES:
+            conn.execute(statement)
+        conn.execute("ANALYZE")
+        conn.commit()
+    finally:
+        conn.close()
+
+    os.replace(tmp_path, output_path)
+    return counts
+
+
+@lru_cache(maxsize=65536)
+def _compile_keys(keys: str):
+    """Translate a vPIC pattern key (SQL Server LIKE syntax, '*' = any char) to a prefix regex"""
+    regex = []
+    i = 0
+    while i < len(keys):
+        char = keys[i]
+        if char == '*':
+            regex.append('.')
+        elif char == '[':
+            end = keys.find(']', i)
+            if end == -1:
+                regex.append(re.escape(char))
+            else:
+                regex.append(keys[i:end + 1])
+                i = end
+        else:
+            regex.append(re.escape(char))
+        i += 1
+    return re.compile(''.join(regex))
+
+
+def model_year_from_vin(vin: str, current_year: Optional[int] = None) -> Optional[int]:
+    """Model year from position 10, using position 7 to pick the 30-year cycle (as vPIC does)"""
+    code = vin[9]
+    if code not in MODEL_YEAR_CODES:
+        return None
+
+    year = 1980 + MODEL_YEAR_CODES.index(code)
+    # Since 2010, light vehicles use a letter in position 7; a digit means the 1980-2009 cycle
+    if not vin[6].isdigit():
+        year += 30
+
+    current_year = current_year or datetime.now().year
+    if year > current_year + 1:
+        year -= 30
+    return year
+
+
+class LocalVPICDatabase:
+    """Read-only decoder over the SQLite file produced by import_vpic"""
+
+    def __init__(self, path: str):
+        if not os.path.exists(path):
+            raise FileNotFoundError(path)
+        self.path = path
+        self._local = threading.local()
+
+        conn = self._connect()
+        self.elements = {}
+        placeholders = ', '.join('?' for _ in DECODED_ELEMENT_CODES)
+        for element_id, code, lookup_table in conn.execute(
+                f"SELECT Id, Code, LookupTable FROM Element WHERE Code IN ({placeholders})", DECODED_ELEMENT_CODES):
+            self.elements[element_id] = (code, lookup_table)
+        self._lookup_cache: Dict[tuple, Optional[str]] = {}
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+            self._local.conn = conn
+        return conn
+
+    def _lookup_name(self, table: str, attribute_id: str) -> Optional[str]:
+        key = (table, attribute_id)
+        if key not in self._lookup_cache:
+            name = None
+            if table in IMPORT_TABLES:
+                row = self._connect().execute(f"SELECT Name FROM {table} WHERE Id = ?", (attribute_id,)).fetchone()
+                name = row[0] if row else None
+            self._lookup_cache[key] = name
+        return self._lookup_cache[key]
+
+    def decode(self, vin: str) -> Optional[Dict]:
+        """Return a DecodeVinValues-style row for the VIN, or None if the WMI is unknown"""
+        vin = vin.upper()
+        conn = self._connect()
+        model_year = model_year_from_vin(vin)
+
+        # Manufacturers building under 1,000 vehicles a year share WMIs ending in 9
+        wmi_code = vin[:3] + vin[11:14] if vin[2] == '9' else vin[:3]
+        wmi = conn.execute("SELECT Id, MakeId FROM Wmi WHERE Wmi = ?", (wmi_code,)).fetchone()
+        if not wmi:
+            return None
+        wmi_id, wmi_make_id = wmi
+
+        row = {'VIN': vin, 'ModelYear': str(model_year) if model_year else ''}
+
+        schema_ids = [r[0] for r in conn.execute(
+            "SELECT VinSchemaId FROM Wmi_VinSchema WHERE WmiId = ? "
+            "AND YearFrom <= ? AND (YearTo IS NULL OR YearTo >= ?)",
+            (wmi_id, model_year or 0, model_year or 0)
+        )]
+
+        if schema_ids and self.elements:
+            descriptor = f"{vin[3:8]}|{vin[9:17]}"
+            best: Dict[int, tuple] = {}  # element id -> (specificity, attribute id)
+
+            schema_marks = ', '.join('?' for _ in schema_ids)
+            element_marks = ', '.join('?' for _ in self.elements)
+            for keys, element_id, attribute_id in conn.execute(
+                    f"SELECT Keys, ElementId, AttributeId FROM Pattern "
+                    f"WHERE VinSchemaId IN ({schema_marks}) AND ElementId IN ({element_marks})",
+                    [*schema_ids, *self.elements]):
+                if not keys or not _compile_keys(keys).match(descriptor):
+                    continue
+                # Prefer the pattern pinning down the most positions
+                specificity = len(keys) - keys.count('*')
+                if element_id not in best or specificity > best[element_id][0]:
+                    best[element_id] = (specificity, attribute_id)
+
+            for element_id, (_, attribute_id) in best.items():
+                code, lookup_table = self.elements[element_id]
+                row[code] = self._lookup_name(lookup_table, attribute_id) if lookup_table else attribute_id
+
+        if not row.get('Make'):
+            makes = [r[0] for r in conn.execute("SELECT MakeId FROM Wmi_Make WHERE WmiId = ?", (wmi_id,))]
+            make_id = makes[0] if len(makes) == 1 else wmi_make_id
+            if make_id:
+                row['Make'] = self._lookup_name('Make', make_id)
+
+        return row
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Import the NHTSA vPIC standalone database into SQLite')
+    parser.add_argument('--source', required=True, help='Directory of <Table>.csv exports')
+    parser.add_argument('--output', default=os.path.join('instance', 'vpic.sqlite3'))
+    args = parser.parse_args()
+
+    started = time.time()
+    try:
+        counts = import_vpic(args.source, args.output)
+    except FileNotFoundError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    print(f"✅ Imported {sum(counts.values()):,} rows into {args.output} in {time.time() - started:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,240 @@
+"""Local stand-in for the NHTSA vPIC API, for load testing /check offline.
+
+Serves DecodeVinValues/{vin} and DecodeVINValuesBatch/ from a fixture corpus,
+with configurable latency, error rate and throttling. Point the app at it with:
+
+    python vpic_stub_server.py --port 8765 --latency-ms 150 --error-rate 0.02
+    VPIC_BASE_URL=http://127.0.0.1:8765/api/vehicles python app.py
+
+Run with --record to proxy VINs missing from the corpus to the real API and
+save the responses, so later runs replay them without touching NHTSA.
+"""
+import argparse
+import json
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+import requests
+
+DEFAULT_FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'vpic_decodes.json')
+UPSTREAM_URL = "https://vpic.nhtsa.dot.gov/api/vehicles"
+
+
+class FixtureStore:
+    """VIN -> flat DecodeVinValues row, optionally recording misses from the real API"""
+
+    def __init__(self, path: str, record: bool = False, upstream_url: str = UPSTREAM_URL):
+        self.path = path
+        self.record = record
+        self.upstream_url = upstream_url
+        self._lock = threading.Lock()
+        self.rows: Dict[str, Dict] = {}
+
+        if os.path.exists(path):
+            with open(path) as f:
+                self.rows = json.load(f)
+
+    def get(self, vin: str) -> Dict:
+        vin = vin.strip().upper()
+        row = self.rows.get(vin)
+        if row is None and self.record:
+            row = self._record(vin)
+        return row or self._not_found_row(vin)
+
+    def _record(self, vin: str) -> Optional[Dict]:
+        try:
+            response = requests.get(f"{self.upstream_url}/DecodeVinValues/{vin}?format=json", timeout=15)
+            response.raise_for_status()
+            results = response.json().get('Results') or []
+        except Exception as e:
+            print(f"Failed to record {vin} from upstream: {e}")
+            return None
+
+        if not results:
+            return None
+
+        with self._lock:
+            self.rows[vin] = results[0]
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(self.rows, f, indent=2)
+                f.write('\n')
+            os.replace(tmp_path, self.path)
+        print(f"Recorded {vin}")
+        return results[0]
+
+    @staticmethod
+    def _not_found_row(vin: str) -> Dict:
+        # Shape of a vPIC answer for a VIN it cannot decode
+        return {
+            'VIN': vin, 'Make': '', 'Model': '', 'ModelYear': '', 'BodyClass': '',
+            'ErrorCode': '1', 'ErrorText': '1 - Check Digit (9th position) does not calculate properly'
+        }
+
+
+class Throttle:
+    """Fixed one-second window request counter; 0 disables throttling"""
+
+    def __init__(self, max_rps: float):
+        self.max_rps = max_rps
+        self._lock = threading.Lock()
+        self._window = int(time.time())
+        self._count = 0
+
+    def allow(self) -> bool:
+        if not self.max_rps:
+            return True
+        with self._lock:
+            now = int(time.time())
+            if now != self._window:
+                self._window = now
+                self._count = 0
+            self._count += 1
+            return self._count <= self.max_rps
+
+
+class StubConfig:
+    def __init__(self, store: FixtureStore, latency_ms: float = 0, jitter_ms: float = 0,
+                 error_rate: float = 0, max_rps: float = 0):
+        self.store = store
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.throttle = Throttle(max_rps)
+        self.requests_served = 0
+        self.errors_injected = 0
+        self.throttled = 0
+
+
+class VPICStubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Headers and body go out in separate writes; without this, Nagle + delayed ACK adds ~40ms per keep-alive call
+    disable_nagle_algorithm = True
+    config: StubConfig = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        if parsed.path == '/stats':
+            self._send_json(200, {
+                'requests_served': self.config.requests_served,
+                'errors_injected': self.config.errors_injected,
+                'throttled': self.config.throttled,
+                'fixtures': len(self.config.store.rows)
+            })
+            return
+
+        prefix = '/api/vehicles/DecodeVinValues/'
+        if not parsed.path.startswith(prefix):
+            self._send_json(404, {'Message': 'Not found'})
+            return
+
+        if not self._simulate_conditions():
+            return
+
+        vin = parsed.path[len(prefix):].strip('/')
+        self._send_results([self.config.store.get(vin)])
+
+    def do_POST(self):
+        parsed = urlparse(self.path)
+        if parsed.path.rstrip('/') != '/api/vehicles/DecodeVINValuesBatch':
+            self._send_json(404, {'Message': 'Not found'})
+            return
+
+        length = int(self.headers.get('Content-Length', 0))
+        form = parse_qs(self.rfile.read(length).decode('utf-8'))
+
+        if not self._simulate_conditions():
+            return
+
+        # Batch entries are 'VIN' or 'VIN,modelyear', separated by ';'
+        entries = [entry for entry in form.get('data', [''])[0].split(';') if entry.strip()]
+        rows = [self.config.store.get(entry.split(',')[0]) for entry in entries]
+        self._send_results(rows)
+
+    def _simulate_conditions(self) -> bool:
+        """Apply throttling, latency and injected errors; False if a response was already sent"""
+        config = self.config
+
+        if not config.throttle.allow():
+            config.throttled += 1
+            self._send_json(429, {'Message': 'Too many requests'})
+            return False
+
+        delay_ms = config.latency_ms + random.uniform(0, config.jitter_ms)
+        if delay_ms > 0:
+            time.sleep(delay_ms / 1000.0)
+
+        if config.error_rate and random.random() < config.error_rate:
+            config.errors_injected += 1
+            self._send_json(503, {'Message': 'Injected error'})
+            return False
+
+        config.requests_served += 1
+        return True
+
+    def _send_results(self, rows: List[Dict]):
+        self._send_json(200, {
+            'Count': len(rows),
+            'Message': 'Results returned successfully',
+            'SearchCriteria': None,
+            'Results': rows
+        })
+
+    def _send_json(self, status: int, payload: Dict):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def start_stub_server(host: str = '127.0.0.1', port: int = 0, fixtures: str = DEFAULT_FIXTURES,
+                      record: bool = False, latency_ms: float = 0, jitter_ms: float = 0,
+                      error_rate: float = 0, max_rps: float = 0) -> ThreadingHTTPServer:
+    """Start the stub on a daemon thread; the API root is http://host:server_port/api/vehicles"""
+    config = StubConfig(FixtureStore(fixtures, record=record), latency_ms, jitter_ms, error_rate, max_rps)
+    handler = type('ConfiguredVPICStubHandler', (VPICStubHandler,), {'config': config})
+
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    server.config = config
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local NHTSA vPIC stand-in server')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--fixtures', default=DEFAULT_FIXTURES, help='JSON file of VIN -> DecodeVinValues row')
+    parser.add_argument('--record', action='store_true', help='Fetch and save VINs missing from the fixtures')
+    parser.add_argument('--latency-ms', type=float, default=0, help='Base latency added to every response')
+    parser.add_argument('--jitter-ms', type=float, default=0, help='Random extra latency, 0..jitter')
+    parser.add_argument('--error-rate', type=float, default=0, help='Fraction of requests answered with 503')
+    parser.add_argument('--max-rps', type=float, default=0, help='Requests per second before answering 429 (0 = off)')
+    args = parser.parse_args()
+
+    server = start_stub_server(args.host, args.port, args.fixtures, args.record,
+                               args.latency_ms, args.jitter_ms, args.error_rate, args.max_rps)
+    print(f"vPIC stub serving {len(server.config.store.rows)} fixtures at "
+          f"http://{args.host}:{server.server_port}/api/vehicles")
+    print(f"Set VPIC_BASE_URL=http://{args.host}:{server.server_port}/api/vehicles to use it")
+
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()